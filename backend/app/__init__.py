@@ -1,3 +1,11 @@
-from app.routes import text_processing, health
+import importlib
 
-__all__ = ["text_processing", "health"]
\ No newline at end of file
+__all__ = ["text_processing", "health", "websocket", "sessions"]
+
+
+def __getattr__(name):
+    # Route modules (and FastAPI with them) load on first access, so importing
+    # app.startup or the bulk CLI does not pull in the whole web stack
+    if name in __all__:
+        return importlib.import_module(f"app.routes.{name}")
+    raise AttributeError(f"module 'app' has no attribute {name!r}")
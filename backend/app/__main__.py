@@ -0,0 +1,46 @@
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from app.config import config
+from app.logging_setup import configure_logging
+from app.services.shared_state import SharedStateStore
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Sentiment Aura Backend")
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--workers", type=int, default=config.WORKERS)
+    parser.add_argument("--reload", action="store_true", help="development only, forces one worker")
+    args = parser.parse_args()
+
+    workers = 1 if args.reload else max(1, args.workers)
+    # Workers are fresh interpreters that read their settings from the environment
+    os.environ["WORKERS"] = str(workers)
+
+    if workers > 1:
+        # Metrics and buckets left behind by a previous run would be summed in
+        store = SharedStateStore(config.SHARED_STATE_PATH)
+        store.reset()
+        store.close()
+
+    configure_logging()
+    logger.info("Starting %d worker(s) on %s:%s", workers, args.host, args.port)
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        reload=args.reload,
+        log_level=config.LOG_LEVEL.lower()
+    )
+
+
+if __name__ == "__main__":
+    main()
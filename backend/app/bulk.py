@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional, Set, TextIO, Tuple
+
+from app.config import config
+from app.logging_setup import configure_logging
+from app.services.cache import create_result_cache
+from app.services.http_pool import create_http_client
+from app.services.llm_service import LLMService
+from app.services.preprocessor import TranscriptPreprocessor
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[int, Optional[str], Optional[str]]
+
+
+def read_rows(path: str, fmt: str, text_field: str, id_field: str) -> Iterator[Row]:
+    # Yields (row, id, text) lazily; row numbers are line numbers (JSONL) or
+    # record numbers (CSV) so they stay stable between runs for resuming
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for row, record in enumerate(csv.DictReader(f)):
+                yield row, record.get(id_field), record.get(text_field)
+            return
+
+        for row, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield row, None, None
+                continue
+            if isinstance(record, str):
+                yield row, None, record
+            elif isinstance(record, dict):
+                text = record.get(text_field)
+                yield row, record.get(id_field), text if isinstance(text, str) else None
+            else:
+                yield row, None, None
+
+
+def load_checkpoint(path: str) -> Set[int]:
+    # The output file is the checkpoint: every row with a success line is done.
+    # A line cut short by a crash is truncated away before appending again
+    done: Set[int] = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+            logger.warning("Dropped a partial last line from %s", path)
+
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if record.get("status") == "success":
+            done.add(record["row"])
+    return done
+
+
+class BulkProgress:
+
+    def __init__(self, llm_service: LLMService, interval: float, stream: TextIO = sys.stderr):
+        self.llm_service = llm_service
+        self.interval = interval
+        self.stream = stream
+        self.started = time.monotonic()
+
+        self.succeeded = 0
+        self.fallbacks = 0
+        self.failed = 0
+        self.skipped = 0
+        self._last_time = self.started
+        self._last_done = 0
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.fallbacks + self.failed
+
+    def line(self) -> str:
+        now = time.monotonic()
+        elapsed = max(now - self.started, 1e-9)
+        recent = (self.done - self._last_done) / max(now - self._last_time, 1e-9)
+        self._last_time, self._last_done = now, self.done
+        usage = self.llm_service.usage
+        return (
+            f"{self.done} rows in {elapsed:.0f}s ({self.done / elapsed:.1f}/s, last {recent:.1f}/s) | "
+            f"{self.succeeded} ok, {self.fallbacks} fallback, {self.failed} failed, {self.skipped} skipped | "
+            f"{usage.requests} upstream calls, {usage.prompt_tokens + usage.completion_tokens} tokens"
+        )
+
+    def report(self) -> None:
+        print(self.line(), file=self.stream, flush=True)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.report()
+
+
+async def run_bulk(args: argparse.Namespace) -> BulkProgress:
+    done = load_checkpoint(args.output) if args.resume else set()
+    if not args.resume and os.path.exists(args.output) and os.path.getsize(args.output) > 0:
+        raise SystemExit(f"{args.output} already exists; pass --resume to continue it or remove it")
+
+    http_client = create_http_client()
+    cache = create_result_cache()
+    # The server may have the similarity index files mapped; this run keeps its own in memory
+    llm_service = LLMService(http_client=http_client, cache=cache, persist_similarity_index=False)
+    # Archived transcripts are long, so they are segmented the same way /process_text does
+    preprocessor = (
+        TranscriptPreprocessor(llm_service, config.PREPROCESS_SEGMENT_CHARS)
+        if config.PREPROCESS_ENABLED else None
+    )
+
+    progress = BulkProgress(llm_service, args.progress_interval)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    output = open(args.output, "a", encoding="utf-8")
+    last_sync = time.monotonic()
+
+    def write(record: Dict) -> None:
+        nonlocal last_sync
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        # Flushed lines survive a crashed process; fsync bounds what a lost host costs
+        if time.monotonic() - last_sync >= args.sync_interval:
+            os.fsync(output.fileno())
+            last_sync = time.monotonic()
+
+    async def analyze(row: int, row_id: Optional[str], text: Optional[str]) -> None:
+        record = {"row": row, "id": row_id}
+        text = text.strip() if text else ""
+        if not text:
+            progress.failed += 1
+            write({**record, "status": "error", "error": "Row has no text"})
+            return
+        try:
+            if preprocessor is not None:
+                analysis, is_fallback = await preprocessor.analyze_with_status(text)
+            else:
+                analysis, is_fallback = await llm_service.analyze_text_with_status(text)
+        except Exception as e:
+            logger.error("Row %s failed: %s", row, e)
+            progress.failed += 1
+            write({**record, "status": "error", "error": str(e)})
+            return
+        if is_fallback:
+            # Keyword-only answer from an upstream outage; --resume analyzes the row again
+            progress.fallbacks += 1
+            write({**record, "status": "fallback", "analysis": analysis})
+            return
+        progress.succeeded += 1
+        write({**record, "status": "success", "analysis": analysis})
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                await analyze(*item)
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+    reporter = asyncio.create_task(progress.run())
+    try:
+        for row, row_id, text in read_rows(args.input, args.format, args.text_field, args.id_field):
+            if args.limit is not None and row >= args.limit:
+                break
+            if row in done:
+                progress.skipped += 1
+                continue
+            # Blocks once `concurrency * 2` rows are waiting, so input is read as it is consumed
+            await queue.put((row, row_id, text))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        reporter.cancel()
+        for task in workers:
+            task.cancel()
+        output.flush()
+        os.fsync(output.fileno())
+        output.close()
+        await llm_service.close()
+        await http_client.aclose()
+        if cache is not None:
+            await cache.close()
+
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Analyze a JSONL or CSV file of texts without going through the HTTP API"
+    )
+    parser.add_argument("input", help="JSONL (objects or bare strings, one per line) or CSV with a header row")
+    parser.add_argument("output", help="JSONL results, one line per row, appended as rows finish")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="default: from the input file extension")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id", help="copied to the output so rows can be joined back")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY)
+    parser.add_argument("--resume", action="store_true",
+                        help="skip rows that already succeeded in OUTPUT; failed rows and rows answered "
+                             "by the keyword fallback are retried and the last line for a row wins")
+    parser.add_argument("--limit", type=int, help="only rows numbered below this")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="seconds between progress lines")
+    parser.add_argument("--sync-interval", type=float, default=5.0, help="seconds between fsyncs of OUTPUT")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    if args.format is None:
+        args.format = "csv" if args.input.lower().endswith(".csv") else "jsonl"
+    args.concurrency = max(1, args.concurrency)
+
+    configure_logging()
+    logging.getLogger().setLevel(args.log_level.upper())
+    config.validate()
+
+    progress = asyncio.run(run_bulk(args))
+    progress.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+from app.services.metrics import ANALYSES_CANCELLED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# nginx's "client closed request"; nobody reads it, but access logs and
+# http_requests_total can tell abandoned requests from served ones
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def _wait_for_disconnect(req: Request) -> None:
+    # Only for requests whose body has been read already; any further message
+    # from the server is the disconnect
+    while True:
+        message = await req.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(req: Request, work: Awaitable[T]) -> T:
+    # Runs `work` until it finishes or the client goes away. On disconnect the
+    # work is cancelled, which reaches the upstream call through LLMService
+    # once no other request is waiting on the same analysis
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(req))
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        watcher.cancel()
+        raise
+
+    watcher.cancel()
+    if task.done():
+        return task.result()
+
+    task.cancel()
+    # Unwinding releases semaphores and batch slots before the route returns
+    await asyncio.wait((task,))
+    if not task.cancelled():
+        # A cancelled gather() ends with an exception instead; read it so it is not logged
+        task.exception()
+    ANALYSES_CANCELLED.labels("client_disconnect").inc()
+    logger.info("Client disconnected, analysis cancelled")
+    raise ClientDisconnected()
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -10,10 +10,50 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    # Point at any OpenAI-compatible server, e.g. bench/mock_openai.py
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL") or None
+    # USD per 1K tokens, only used for the cost estimate in /metrics
+    OPENAI_PROMPT_COST_PER_1K: float = float(os.getenv("OPENAI_PROMPT_COST_PER_1K", 0.0005))
+    OPENAI_COMPLETION_COST_PER_1K: float = float(os.getenv("OPENAI_COMPLETION_COST_PER_1K", 0.0015))
+    
+    # Anthropic Configuration
+    ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
+    ANTHROPIC_MODEL: str = os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
+    
+    # LLM Provider Routing: comma-separated, in order of preference
+    # ("openai", "anthropic", "mock"); the fastest healthy one is used
+    LLM_PROVIDERS: List[str] = [
+        name.strip().lower()
+        for name in os.getenv("LLM_PROVIDERS", "openai").split(",")
+        if name.strip()
+    ]
+    ROUTER_EWMA_ALPHA: float = float(os.getenv("ROUTER_EWMA_ALPHA", 0.2))
+    # A provider demoted by errors or slowness is tried again after this long
+    ROUTER_REPROBE_SECONDS: float = float(os.getenv("ROUTER_REPROBE_SECONDS", 30))
+    # A second provider is called once the first is slower than its own p95
+    HEDGING_ENABLED: bool = os.getenv("HEDGING_ENABLED", "true").lower() == "true"
+    HEDGE_MIN_DELAY_MS: float = float(os.getenv("HEDGE_MIN_DELAY_MS", 100))
+    HEDGE_DEFAULT_DELAY_MS: float = float(os.getenv("HEDGE_DEFAULT_DELAY_MS", 1500))
+    
+    # Mock Provider Configuration (local testing and benchmarks only)
+    MOCK_PROVIDER_LATENCY_MS: float = float(os.getenv("MOCK_PROVIDER_LATENCY_MS", 50))
+    MOCK_PROVIDER_JITTER_MS: float = float(os.getenv("MOCK_PROVIDER_JITTER_MS", 0))
+    MOCK_PROVIDER_ERROR_RATE: float = float(os.getenv("MOCK_PROVIDER_ERROR_RATE", 0))
+    MOCK_PROVIDER_MALFORMED_RATE: float = float(os.getenv("MOCK_PROVIDER_MALFORMED_RATE", 0))
+    
+    # Analysis Mode: "llm" (OpenAI only), "local" (local scorer only) or
+    # "hybrid" (local scorer first, OpenAI for low-confidence texts)
+    ANALYSIS_MODE: str = os.getenv("ANALYSIS_MODE", "llm").lower()
+    LOCAL_CONFIDENCE_THRESHOLD: float = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", 0.6))
     
     # Server Configuration
     PORT: int = int(os.getenv("PORT", 8000))
     HOST: str = os.getenv("HOST", "0.0.0.0")
+    # With more than one worker, cache, metrics and rate-limit state are
+    # shared between processes through SHARED_STATE_PATH (see `python -m app`)
+    WORKERS: int = int(os.getenv("WORKERS", 1))
+    SHARED_STATE_PATH: str = os.getenv("SHARED_STATE_PATH", "shared_state.db")
+    METRICS_SYNC_INTERVAL: float = float(os.getenv("METRICS_SYNC_INTERVAL", 2))
     
     # CORS Configuration
     CORS_ORIGINS: List[str] = os.getenv(
@@ -24,20 +64,164 @@ class Config:
     # API Configuration
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", 30))
     MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", 3))
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", 60))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", 20))
+    # Comma-separated client API keys that get their own bucket (sent as
+    # X-API-Key or Bearer); any other client is limited by its IP address
+    RATE_LIMIT_API_KEYS: List[str] = [
+        key.strip()
+        for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",")
+        if key.strip()
+    ]
+    
+    # Admission Control Configuration (global, across all clients)
+    MAX_CONCURRENT_ANALYSES: int = int(os.getenv("MAX_CONCURRENT_ANALYSES", 64))
+    MAX_QUEUED_ANALYSES: int = int(os.getenv("MAX_QUEUED_ANALYSES", 128))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2))
+    # Overall budget for one analysis across all attempts and backoff sleeps
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", 15))
+    RETRY_BACKOFF_BASE: float = float(os.getenv("RETRY_BACKOFF_BASE", 0.5))
+    RETRY_BACKOFF_MAX: float = float(os.getenv("RETRY_BACKOFF_MAX", 4))
+    
+    # Retry Budget Configuration (shared across requests)
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", 0.2))
+    RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", 1))
+    RETRY_BUDGET_WINDOW_SECONDS: float = float(os.getenv("RETRY_BUDGET_WINDOW_SECONDS", 10))
+    
+    # Circuit Breaker Configuration
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_RECOVERY_SECONDS: float = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", 30))
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", 1))
+
+    # HTTP Connection Pool Configuration
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+    HTTP_POOL_TIMEOUT: float = float(os.getenv("HTTP_POOL_TIMEOUT", 5))
+
+    # Startup warm-up, finished before /ready reports ready
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 10))
+    # Connections opened to each provider ahead of traffic (kept idle in the pool)
+    WARMUP_CONNECTIONS: int = int(os.getenv("WARMUP_CONNECTIONS", 2))
+    # Persisted results loaded into the in-memory cache tier
+    WARMUP_CACHE_ENTRIES: int = int(os.getenv("WARMUP_CACHE_ENTRIES", 1000))
+
+    # Result Cache Configuration
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", 3600))
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "none")
+    CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH", "analysis_cache.db")
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Nearest-neighbour reuse of LLM results for paraphrased texts
+    SIMILARITY_INDEX_ENABLED: bool = os.getenv("SIMILARITY_INDEX_ENABLED", "false").lower() == "true"
+    # Directory of the memory-mapped index; with WORKERS > 1 each worker keeps its own in memory
+    SIMILARITY_INDEX_PATH: str = os.getenv("SIMILARITY_INDEX_PATH", "similarity_index")
+    SIMILARITY_INDEX_DIM: int = int(os.getenv("SIMILARITY_INDEX_DIM", 256))
+    SIMILARITY_INDEX_CAPACITY: int = int(os.getenv("SIMILARITY_INDEX_CAPACITY", 20000))
+    SIMILARITY_THRESHOLD: float = float(os.getenv("SIMILARITY_THRESHOLD", 0.85))
+    SIMILARITY_MIN_CHARS: int = int(os.getenv("SIMILARITY_MIN_CHARS", 20))
+
+    # Batch Processing Configuration
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", 100))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", 8))
+    BATCH_PACK_SIZE: int = int(os.getenv("BATCH_PACK_SIZE", 10))
+    BATCH_PACK_MAX_CHARS: int = int(os.getenv("BATCH_PACK_MAX_CHARS", 200))
+    
+    # Micro-batching: concurrent short texts (<= BATCH_PACK_MAX_CHARS) are
+    # collected for a few milliseconds and sent as one packed request
+    MICRO_BATCH_ENABLED: bool = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+    MICRO_BATCH_WINDOW_MS: float = float(os.getenv("MICRO_BATCH_WINDOW_MS", 20))
+    MICRO_BATCH_MAX_ITEMS: int = int(os.getenv("MICRO_BATCH_MAX_ITEMS", 16))
+    
+    # Live WebSocket Analysis Configuration
+    WS_INTERIM_DEBOUNCE_MS: int = int(os.getenv("WS_INTERIM_DEBOUNCE_MS", 250))
+    WS_INTERIM_MIN_CHARS: int = int(os.getenv("WS_INTERIM_MIN_CHARS", 10))
+    
+    # Transcript Pre-processing: long texts are analyzed as sentence-level
+    # segments, and text a session already sent is not analyzed again
+    PREPROCESS_ENABLED: bool = os.getenv("PREPROCESS_ENABLED", "true").lower() == "true"
+    PREPROCESS_SEGMENT_CHARS: int = int(os.getenv("PREPROCESS_SEGMENT_CHARS", 400))
+    
+    # Session Aggregation Configuration (rolling per-session sentiment state)
+    SESSION_WINDOW_SIZE: int = int(os.getenv("SESSION_WINDOW_SIZE", 50))
+    SESSION_EWMA_ALPHA: float = float(os.getenv("SESSION_EWMA_ALPHA", 0.3))
+    SESSION_TOP_KEYWORDS: int = int(os.getenv("SESSION_TOP_KEYWORDS", 10))
+    SESSION_IDLE_TTL_SECONDS: float = float(os.getenv("SESSION_IDLE_TTL_SECONDS", 1800))
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", 10000))
     
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # "json" for one structured record per line, "text" for the classic format
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower()
+    # Fraction of requests whose INFO/DEBUG records are kept; warnings always are
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+    # Records waiting for the background writer; beyond this they are dropped
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # How often the background writer flushes queued records to stderr
+    LOG_FLUSH_INTERVAL_MS: float = float(os.getenv("LOG_FLUSH_INTERVAL_MS", "50"))
     
     # Response Configuration
     MAX_KEYWORDS: int = 5
     
     @classmethod
     def validate(cls) -> None:
-        if not cls.OPENAI_API_KEY:
+        if not cls.LLM_PROVIDERS:
+            raise ValueError("At least one LLM provider must be configured in LLM_PROVIDERS")
+
+        unknown = set(cls.LLM_PROVIDERS) - {"openai", "anthropic", "mock"}
+        if unknown:
+            raise ValueError(f"Unknown LLM_PROVIDERS: {', '.join(sorted(unknown))}")
+
+        if "openai" in cls.LLM_PROVIDERS and not cls.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is required. Please set it in your .env file")
+
+        if "anthropic" in cls.LLM_PROVIDERS and not cls.ANTHROPIC_API_KEY:
+            raise ValueError("ANTHROPIC_API_KEY is required when anthropic is in LLM_PROVIDERS")
         
         if not cls.CORS_ORIGINS:
             raise ValueError("At least one CORS origin must be configured")
 
+        if cls.ANALYSIS_MODE not in ("llm", "local", "hybrid"):
+            raise ValueError("ANALYSIS_MODE must be one of: llm, local, hybrid")
+
+        if cls.WORKERS < 1:
+            raise ValueError("WORKERS must be at least 1")
+
+        if cls.PREPROCESS_SEGMENT_CHARS < 50:
+            raise ValueError("PREPROCESS_SEGMENT_CHARS must be at least 50")
+
+        if not 0.0 <= cls.LOG_SAMPLE_RATE <= 1.0:
+            raise ValueError("LOG_SAMPLE_RATE must be between 0 and 1")
+
+        if cls.LOG_FORMAT not in ("json", "text"):
+            raise ValueError("LOG_FORMAT must be 'json' or 'text'")
+
+        if cls.SESSION_WINDOW_SIZE < 1 or cls.SESSION_MAX_SESSIONS < 1:
+            raise ValueError("SESSION_WINDOW_SIZE and SESSION_MAX_SESSIONS must be at least 1")
+
+        if cls.MAX_CONCURRENT_ANALYSES < 1:
+            raise ValueError("MAX_CONCURRENT_ANALYSES must be at least 1")
+
+        if cls.MICRO_BATCH_ENABLED and cls.MICRO_BATCH_MAX_ITEMS < 1:
+            raise ValueError("MICRO_BATCH_MAX_ITEMS must be at least 1")
+
+        if cls.SIMILARITY_INDEX_ENABLED:
+            if cls.SIMILARITY_INDEX_DIM < 16 or cls.SIMILARITY_INDEX_CAPACITY < 1:
+                raise ValueError("SIMILARITY_INDEX_DIM must be at least 16 and SIMILARITY_INDEX_CAPACITY at least 1")
+            if not 0.0 < cls.SIMILARITY_THRESHOLD <= 1.0:
+                raise ValueError("SIMILARITY_THRESHOLD must be in (0, 1]")
+
+        if cls.WARMUP_CONNECTIONS < 0 or cls.WARMUP_TIMEOUT_SECONDS <= 0:
+            raise ValueError("WARMUP_CONNECTIONS must be >= 0 and WARMUP_TIMEOUT_SECONDS > 0")
+
+        if cls.BATCH_CONCURRENCY < 1 or cls.BATCH_PACK_SIZE < 1:
+            raise ValueError("BATCH_CONCURRENCY and BATCH_PACK_SIZE must be at least 1")
+
+        if cls.HTTP_MAX_KEEPALIVE_CONNECTIONS > cls.HTTP_MAX_CONNECTIONS:
+            raise ValueError("HTTP_MAX_KEEPALIVE_CONNECTIONS cannot exceed HTTP_MAX_CONNECTIONS")
+
 config = Config()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import math
+import time
+
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from starlette.requests import HTTPConnection
+
+from app.config import config
+from app.services.metrics import ADMISSION_REJECTIONS, STAGE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+def _key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+# Buckets and the shared store only ever see digests, never the keys themselves
+_KNOWN_KEY_DIGESTS = frozenset(_key_digest(key) for key in config.RATE_LIMIT_API_KEYS)
+
+
+def client_key(req: HTTPConnection) -> str:
+    # Unknown keys fall back to the IP, or a client could get a fresh bucket
+    # (and a full burst) by sending a new key with every request
+    api_key = req.headers.get("x-api-key")
+    if not api_key:
+        authorization = req.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            api_key = authorization[7:].strip()
+
+    if api_key:
+        digest = _key_digest(api_key)
+        if digest in _KNOWN_KEY_DIGESTS:
+            return f"key:{digest}"
+
+    return f"ip:{req.client.host if req.client else 'unknown'}"
+
+
+async def charge_rate_limit(conn: HTTPConnection, cost: float = 1.0) -> Optional[float]:
+    # RATE_LIMIT_PER_MINUTE budgets analyses, not requests, so routes that start
+    # several upstream calls charge one token per text. Returns None when
+    # allowed, otherwise the seconds until the client can afford `cost`
+    rate_limiter = conn.app.state.rate_limiter
+    if rate_limiter is None or cost <= 0:
+        return None
+    allowed, retry_after = await rate_limiter.acquire(client_key(conn), cost)
+    if allowed:
+        return None
+    ADMISSION_REJECTIONS.labels("rate_limited").inc()
+    return retry_after
+
+
+def rate_limited_error(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Rate limit exceeded",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+async def _acquire_analysis_slot(req: Request):
+    limiter = req.app.state.concurrency_limiter
+    wait_start = time.perf_counter()
+    if not await limiter.acquire():
+        ADMISSION_REJECTIONS.labels("overloaded").inc()
+        logger.debug("Rejecting request: analysis capacity exhausted")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity, please retry",
+            headers={"Retry-After": str(limiter.retry_after())}
+        )
+    STAGE_LATENCY.labels("admission_wait").observe(time.perf_counter() - wait_start)
+    return limiter
+
+
+async def admission_control(req: Request):
+    retry_after = await charge_rate_limit(req)
+    if retry_after is not None:
+        raise rate_limited_error(retry_after)
+
+    limiter = await _acquire_analysis_slot(req)
+    try:
+        yield
+    finally:
+        limiter.release()
+
+
+async def concurrency_control(req: Request):
+    # For batch routes, which charge the rate limit per text themselves
+    limiter = await _acquire_analysis_slot(req)
+    try:
+        yield
+    finally:
+        limiter.release()
@@ -0,0 +1,181 @@
+import atexit
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from logging.handlers import QueueHandler
+from typing import Deque, Optional, TextIO
+
+from app.config import config
+from app.services.metrics import LOG_RECORDS_DROPPED
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_sampled_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+_writer: Optional["AsyncLogWriter"] = None
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+def bind_request(request_id: Optional[str] = None):
+    # The sampling decision is made once per request, so a kept request logs
+    # all of its INFO lines and a dropped one none of them
+    request_id = request_id or uuid.uuid4().hex
+    sampled = config.LOG_SAMPLE_RATE >= 1.0 or random.random() < config.LOG_SAMPLE_RATE
+    return request_id, (request_id_var.set(request_id), _sampled_var.set(sampled))
+
+
+def unbind_request(tokens) -> None:
+    id_token, sampled_token = tokens
+    request_id_var.reset(id_token)
+    _sampled_var.reset(sampled_token)
+
+
+class RequestContextFilter(logging.Filter):
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        record.request_id = request_id or "-"
+        # Warnings and errors are never sampled away
+        if request_id is not None and record.levelno < logging.WARNING:
+            return _sampled_var.get()
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+
+    # Runs on the calling thread: resolves the message and hands the record to
+    # the writer thread without ever blocking; a full queue drops the record
+    def __init__(self, records: Deque[logging.LogRecord], max_size: int):
+        super().__init__(records)
+        self.max_size = max_size
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Handler.handle() holds self.lock around emit(), which serializes the
+        # counter update below across the threads that log
+        if len(self.queue) >= self.max_size:
+            LOG_RECORDS_DROPPED.inc()
+            return
+        self.queue.append(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # This is the root's only handler, so the record is finalized in place
+        # rather than copied; args are resolved now while they are still current
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class AsyncLogWriter:
+
+    # Wakes every `interval` seconds and writes everything queued since in one
+    # write and flush, so the event loop never waits on stderr and the thread
+    # contends for the GIL once per batch rather than once per record
+    def __init__(self, records: Deque[logging.LogRecord], formatter: logging.Formatter,
+                 stream: TextIO, interval: float):
+        self.records = records
+        self.formatter = formatter
+        self.stream = stream
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._drain()
+        self._drain()
+
+    def _drain(self) -> None:
+        lines = []
+        records = self.records
+        while records:
+            record = records.popleft()
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(f"{record.levelname}:{record.name}:<unformattable log record>")
+        if lines:
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            except Exception:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": "%s.%03dZ" % (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)), record.msecs),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            entry["request_id"] = request_id
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode("utf-8")
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    global _writer
+    if _writer is not None:
+        return
+
+    formatter = logging.Formatter(TEXT_FORMAT) if config.LOG_FORMAT == "text" else JSONFormatter()
+
+    # Callers only pay for creating a record and a deque append; formatting
+    # and the write to stderr happen on the writer's background thread
+    records: Deque[logging.LogRecord] = deque()
+    handler = AsyncQueueHandler(records, max(1, config.LOG_QUEUE_SIZE))
+    handler.addFilter(RequestContextFilter())
+
+    # Per-record fields neither formatter prints; the logging HOWTO's
+    # optimization switches skip collecting them
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, config.LOG_LEVEL.upper(), logging.INFO))
+
+    _writer = AsyncLogWriter(records, formatter, sys.stderr, config.LOG_FLUSH_INTERVAL_MS / 1000)
+    _writer.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    global _writer
+    if _writer is not None:
+        # Writes whatever is still queued before returning
+        _writer.stop()
+        _writer = None
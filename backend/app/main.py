@@ -1,46 +1,150 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from app.startup import startup_timings
+
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
-from app.config import config
-from app.services.llm_service import LLMService
-from app.routes import text_processing, health
+# Import cost is recorded per layer and reported at /status
+with startup_timings.phase("import_framework"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+
+with startup_timings.phase("import_services"):
+    from app.config import config
+    from app.services.llm_service import LLMService
+    from app.services.http_pool import create_http_client
+    from app.services.cache import create_result_cache
+    from app.services.rate_limiter import ConcurrencyLimiter, create_rate_limiter
+    from app.services.shared_state import SharedMetrics, SharedStateStore
+    from app.services.session_aggregator import SessionAggregator, SharedSessionAggregator
+    from app.services.preprocessor import TranscriptPreprocessor
 
-# Setup logging
-logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
+with startup_timings.phase("import_routes"):
+    from app.routes import text_processing, health, websocket, sessions
+    from app.logging_setup import configure_logging
+    from app.middleware import MetricsMiddleware, RequestContextMiddleware
+    from app.responses import FastJSONResponse
+
+# Setup logging: records go through a queue to a background writer thread
+configure_logging()
 logger = logging.getLogger(__name__)
 
+async def warm_up(app: FastAPI):
+    # Runs after the server starts listening: /health answers right away,
+    # /ready only once provider SDKs, pooled connections and caches are warm
+    try:
+        with startup_timings.phase("warmup"):
+            await asyncio.wait_for(
+                app.state.llm_service.warm_up(config.WARMUP_CONNECTIONS, config.WARMUP_CACHE_ENTRIES),
+                timeout=config.WARMUP_TIMEOUT_SECONDS
+            )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # A failed warm-up only costs latency on the first requests, so it does not hold readiness
+        startup_timings.warmup_error = str(e) or type(e).__name__
+        logger.warning("Warm-up did not complete: %s", startup_timings.warmup_error)
+    startup_timings.mark_ready()
+    logger.info("Ready after %.2fs", startup_timings.ready_after)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
     # Startup
-    logger.info(f"Starting Sentiment Aura Backend v1.0.0")
-    logger.info(f"Using OpenAI Model: {config.OPENAI_MODEL}")
+    logger.info("Starting Sentiment Aura Backend v1.0.0")
+    logger.info("Using OpenAI Model: %s", config.OPENAI_MODEL)
     
     # Validate configuration
     try:
         config.validate()
         logger.info("Configuration validated successfully")
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         raise
     
     # Initialize services
-    app.state.llm_service = LLMService()
-    logger.info("OpenAI service initialized")
+    with startup_timings.phase("init_http_pool"):
+        app.state.http_client = create_http_client()
+
+    app.state.shared_state = None
+    app.state.shared_metrics = None
+    if config.WORKERS > 1:
+        # Counters, histograms, rate-limit buckets and session aggregates are pooled across workers
+        with startup_timings.phase("init_shared_state"):
+            app.state.shared_state = SharedStateStore(config.SHARED_STATE_PATH)
+            app.state.shared_metrics = SharedMetrics(app.state.shared_state, config.METRICS_SYNC_INTERVAL)
+            await app.state.shared_metrics.start()
+        logger.info("Shared state enabled at %s (%s workers)", config.SHARED_STATE_PATH, config.WORKERS)
+
+    with startup_timings.phase("init_admission"):
+        app.state.rate_limiter = create_rate_limiter(app.state.shared_state)
+        app.state.concurrency_limiter = ConcurrencyLimiter(
+            config.MAX_CONCURRENT_ANALYSES,
+            config.MAX_QUEUED_ANALYSES,
+            config.ADMISSION_QUEUE_TIMEOUT
+        )
+
+    with startup_timings.phase("init_cache"):
+        app.state.result_cache = create_result_cache()
+
+    with startup_timings.phase("init_llm_service"):
+        app.state.llm_service = LLMService(
+            http_client=app.state.http_client,
+            cache=app.state.result_cache
+        )
+
+    with startup_timings.phase("init_sessions"):
+        app.state.preprocessor = (
+            TranscriptPreprocessor(
+                app.state.llm_service,
+                config.PREPROCESS_SEGMENT_CHARS,
+                max_sessions=config.SESSION_MAX_SESSIONS,
+                idle_ttl=config.SESSION_IDLE_TTL_SECONDS
+            )
+            if config.PREPROCESS_ENABLED else None
+        )
+        session_settings = (
+            config.SESSION_MAX_SESSIONS,
+            config.SESSION_IDLE_TTL_SECONDS,
+            config.SESSION_WINDOW_SIZE,
+            config.SESSION_EWMA_ALPHA,
+            config.SESSION_TOP_KEYWORDS
+        )
+        if app.state.shared_state is not None:
+            app.state.session_aggregator = SharedSessionAggregator(*session_settings, app.state.shared_state)
+        else:
+            app.state.session_aggregator = SessionAggregator(*session_settings)
+    logger.info("LLM service initialized with providers: %s", ', '.join(config.LLM_PROVIDERS))
+
+    app.state.warmup_task = None
+    if config.WARMUP_ENABLED:
+        app.state.warmup_task = asyncio.create_task(warm_up(app))
+    else:
+        startup_timings.mark_ready()
     
     yield
     
-    # Shutdown
+    # Shutdown: stop advertising readiness first so no new traffic is routed here
+    startup_timings.ready = False
     logger.info("Shutting down Sentiment Aura Backend")
+    if app.state.warmup_task is not None and not app.state.warmup_task.done():
+        app.state.warmup_task.cancel()
+    await app.state.llm_service.close()
+    await app.state.http_client.aclose()
+    if app.state.result_cache is not None:
+        await app.state.result_cache.close()
+    if app.state.shared_metrics is not None:
+        await app.state.shared_metrics.stop()
+        app.state.shared_state.close()
+    logger.info("HTTP connection pool closed")
 
 # Create FastAPI app
 app = FastAPI(
     title="Sentiment Aura Backend",
     description="Real-time sentiment analysis API using OpenAI",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -52,9 +156,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
 # Include routers
 app.include_router(text_processing.router, tags=["Analysis"])
 app.include_router(health.router, tags=["Monitoring"])
+app.include_router(websocket.router, tags=["Live Analysis"])
+app.include_router(sessions.router, tags=["Sessions"])
 
 # Root endpoint
 @app.get("/", tags=["General"])
@@ -0,0 +1,89 @@
+import time
+
+from starlette.routing import Match
+
+from app.logging_setup import bind_request, unbind_request
+from app.services.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+
+
+class MetricsMiddleware:
+
+    # Plain ASGI rather than BaseHTTPMiddleware so streaming responses are not
+    # buffered and the per-request overhead stays at a few attribute lookups
+    def __init__(self, app):
+        self.app = app
+        self._route_cache = {}
+
+    def _route_path(self, scope) -> str:
+        # Label by route template, never the raw path, to keep label cardinality bounded
+        key = (scope["method"], scope["path"])
+        path = self._route_cache.get(key)
+        if path is not None:
+            return path
+
+        path = "unmatched"
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                path = getattr(route, "path", "unmatched")
+                break
+
+        if len(self._route_cache) < 1024:
+            self._route_cache[key] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = self._route_path(scope)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(path)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            HTTP_LATENCY.labels(path).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(scope["method"], path, status_code).inc()
+
+
+class RequestContextMiddleware:
+
+    # Gives every HTTP request and WebSocket connection a request ID (the
+    # client's X-Request-ID when it sends one) that log records carry, and
+    # echoes it back on HTTP responses
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")[:128]
+                break
+        request_id, tokens = bind_request(incoming)
+        header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id if scope["type"] == "http" else send)
+        finally:
+            unbind_request(tokens)
@@ -1,41 +1,68 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
 from datetime import datetime
+from typing import Dict, Optional
 import logging
+import os
 
 from app.config import config
+from app.responses import FastJSONResponse
+from app.startup import startup_timings
+from app.services.live_analysis import live_stats
+from app.services import metrics as m
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 start_time = datetime.now()
-request_count = 0
 
-@router.get("/health")
-async def health_check():
-    global request_count
-    request_count += 1
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+async def _registry(req: Request) -> m.MetricsRegistry:
+    # With several workers, counters and histograms are summed across processes
+    shared_metrics = req.app.state.shared_metrics
+    if shared_metrics is None:
+        return m.registry
+    return await shared_metrics.aggregate()
 
+@router.get("/health")
+async def health_check(req: Request):
     uptime = (datetime.now() - start_time).total_seconds()
+    registry = await _registry(req)
 
     return {
         "status": "healthy",
         "version": "1.0.0",
         "uptime_seconds": round(uptime, 2),
-        "total_requests": request_count
+        "total_requests": int(registry.get(m.HTTP_REQUESTS.name).value)
     }
 
+@router.get("/ready")
+async def readiness_check():
+    # Liveness is /health; this stays 503 until warm-up finishes and again once shutdown starts
+    if not startup_timings.ready:
+        return FastJSONResponse({"status": "warming_up"}, status_code=503)
+    return {"status": "ready"}
+
 @router.get("/status")
-async def status():
+async def status(req: Request):
 
     return {
         "status": "operational",
         "model": config.OPENAI_MODEL,
+        "llm_providers": config.LLM_PROVIDERS,
+        "analysis_mode": config.ANALYSIS_MODE,
         "endpoints":{
             "process_text": "POST /process_text",
             "batch_process": "POST /batch_process",
+            "batch_process_stream": "POST /batch_process/stream",
+            "live_analysis": "WS /ws/analyze",
+            "session_aggregate": "GET /sessions/{session_id}",
             "health": "GET /health",
-            "status": "GET /status"
+            "ready": "GET /ready",
+            "status": "GET /status",
+            "metrics": "GET /metrics (Prometheus text; JSON via Accept: application/json or /metrics/json)"
         },
 
         "configuration":{
@@ -43,26 +70,103 @@ async def status():
             "cors_origins": config.CORS_ORIGINS,
             "timeout": f"{config.REQUEST_TIMEOUT} seconds",
             "max_retries": config.MAX_RETRIES,
-            "rate_limit": f"{config.RATE_LIMIT_PER_MINUTE} req/min"
+            "rate_limit": f"{config.RATE_LIMIT_PER_MINUTE} req/min" if config.RATE_LIMIT_ENABLED else "disabled",
+            "rate_limit_burst": config.RATE_LIMIT_BURST,
+            "max_concurrent_analyses": config.MAX_CONCURRENT_ANALYSES,
+            "max_queued_analyses": config.MAX_QUEUED_ANALYSES,
+            "batch_max_items": config.BATCH_MAX_ITEMS,
+            "batch_concurrency": config.BATCH_CONCURRENCY,
+            "request_deadline": f"{config.REQUEST_DEADLINE_SECONDS} seconds"
         },
 
+        "circuit_breaker": req.app.state.llm_service.breaker_stats(),
+
+        "startup": startup_timings.stats(),
+
         "timestamp": datetime.now().isoformat()
     }
 
-@router.get("/metrics")
-async def metrics():
-    global request_count
-    
+async def _component_stats(req: Request) -> Dict:
+    llm_service = req.app.state.llm_service
+    # Everything below is per process; only the registry metrics are pooled
+    return {
+        "worker": {"pid": os.getpid(), "workers": config.WORKERS},
+        "connection_pool": llm_service.pool_stats(),
+        "cache": llm_service.cache_stats(),
+        "single_flight": llm_service.single_flight_stats(),
+        "micro_batching": llm_service.micro_batch_stats(),
+        "similarity_index": llm_service.similarity_stats(),
+        "live_analysis": dict(live_stats),
+        "sessions": await req.app.state.session_aggregator.stats_async(),
+        "preprocessor": req.app.state.preprocessor.stats() if req.app.state.preprocessor else {"enabled": False},
+        "local_scorer": llm_service.local_stats(),
+        "token_usage": llm_service.usage_stats(),
+        "circuit_breaker": llm_service.breaker_stats(),
+        "admission": {
+            "rate_limit": (
+                await req.app.state.rate_limiter.stats_async() if req.app.state.rate_limiter else {"enabled": False}
+            ),
+            "concurrency": req.app.state.concurrency_limiter.stats()
+        }
+    }
+
+async def _json_metrics(req: Request) -> Dict:
+    registry = await _registry(req)
+    http_requests = registry.get(m.HTTP_REQUESTS.name)
+    http_in_flight = registry.get(m.HTTP_IN_FLIGHT.name)
+
     uptime_seconds = (datetime.now() - start_time).total_seconds()
     uptime_hours = round(uptime_seconds / 3600, 2)
-    
+    total_requests = int(http_requests.value)
+
+    endpoints = {}
+    for labels, child in registry.get(m.HTTP_LATENCY.name).children():
+        endpoints[labels["path"]] = {
+            **child.summary(),
+            "in_flight": int(http_in_flight.labels(labels["path"]).value)
+        }
+
+    status_codes = {}
+    for labels, child in http_requests.children():
+        status_codes[labels["status"]] = status_codes.get(labels["status"], 0) + int(child.value)
+
     return {
         "metrics": {
-            "total_requests": request_count,
+            "total_requests": total_requests,
             "uptime_hours": uptime_hours,
             "uptime_seconds": round(uptime_seconds, 2),
             "start_time": start_time.isoformat(),
             "current_time": datetime.now().isoformat(),
-            "requests_per_hour": round(request_count / max(uptime_hours, 0.01), 2)
-        }
-    }
\ No newline at end of file
+            "requests_per_hour": round(total_requests / max(uptime_hours, 0.01), 2),
+            "status_codes": status_codes
+        },
+        "endpoints": endpoints,
+        "stages": {
+            labels["stage"]: child.summary() for labels, child in registry.get(m.STAGE_LATENCY.name).children()
+        },
+        "llm": {
+            "in_flight": int(registry.get(m.LLM_IN_FLIGHT.name).value),
+            "timeouts": int(registry.get(m.LLM_TIMEOUTS.name).value),
+            "retries": {
+                labels["reason"]: int(child.value) for labels, child in registry.get(m.LLM_RETRIES.name).children()
+            },
+            "fallbacks": int(registry.get(m.FALLBACKS.name).value)
+        },
+        **await _component_stats(req)
+    }
+
+@router.get("/metrics")
+async def metrics(req: Request, format: Optional[str] = None):
+    if format is None:
+        format = "json" if "application/json" in req.headers.get("accept", "") else "prometheus"
+
+    if format == "json":
+        return await _json_metrics(req)
+
+    registry = await _registry(req)
+    body = registry.render_prometheus(extra_gauges=await _component_stats(req))
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
+
+@router.get("/metrics/json")
+async def metrics_json(req: Request):
+    return await _json_metrics(req)
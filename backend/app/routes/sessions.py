@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException, Request
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/sessions/{session_id}")
+async def session_aggregate(session_id: str, req: Request):
+    # Served from the rolling state, so the cost does not grow with session length.
+    # With WORKERS > 1 the state is in the shared store, so any worker can answer
+    aggregate = await req.app.state.session_aggregator.get_async(session_id)
+    if aggregate is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return aggregate
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, Field, validator
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
 import logging
 import time
 
+from app.cancellation import CLIENT_CLOSED_REQUEST, ClientDisconnected, cancel_on_disconnect
 from app.config import config
+from app.dependencies import admission_control, charge_rate_limit, concurrency_control, rate_limited_error
+from app.responses import FastJSONResponse
+from app.services.metrics import ANALYSES_CANCELLED, STAGE_LATENCY
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +20,8 @@ router = APIRouter()
 
 class TextRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=5000)
+    # Results are folded into this session's rolling aggregate (GET /sessions/{id})
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128)
 
     @validator("text")
     def validate_text(cls, v):
@@ -25,50 +35,297 @@ class SentimentResponse(BaseModel):
     keywords: List[str] = Field(..., max_items=5)
     dominant_emotion: str = Field(..., pattern="^(joy|sadness|anger|fear|surprise|disgust|neutral)$")
 
-@router.post("/process_text", response_model=SentimentResponse)
+@router.post("/process_text", response_model=SentimentResponse, dependencies=[Depends(admission_control)])
 async def process_text(request: TextRequest, req: Request):
     try:
         start_time = time.time()
-        logger.info(f"Processing text: {request.text[:50]}...")
+        logger.info("Processing text (%d chars)", len(request.text))
+        logger.debug("Text preview: %s", _preview(request.text))
 
         llm_service = req.app.state.llm_service
 
-        result = await llm_service.analyze_text(request.text)
+        preprocessor = req.app.state.preprocessor
+        if preprocessor is not None:
+            result = await cancel_on_disconnect(req, preprocessor.analyze(request.text, request.session_id))
+        else:
+            result = await cancel_on_disconnect(req, llm_service.analyze_text(request.text))
+        if request.session_id:
+            await req.app.state.session_aggregator.record_async(request.session_id, result)
 
         processing_time = time.time() - start_time
-        logger.info(f"Analysis complete in {processing_time:.2f}s")
+        logger.info("Analysis complete in %.2fs", processing_time)
 
-        return result
+        # Already validated by the service; returning a Response skips the
+        # response_model pass, which stays on the route for the OpenAPI schema
+        return FastJSONResponse(result)
+
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     
     except Exception as e:
-        logger.error(f"Error processing text: {str(e)}")
+        logger.error("Error processing text: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.post("/batch_process")
-async def batch_process(texts: List[str], req: Request):
-    if(len(texts) > 10):
-        raise HTTPException(status_code=400, detail="Maximum 10 texts allowed per batch")
-    
-    try:
-        logger.info(f"Processing batch of {len(texts)} texts")
+def _preview(text: str) -> str:
+    return text[:50] + "..." if len(text) > 50 else text
 
-        llm_service = req.app.state.llm_service
-        results = []
-
-        for text in texts:
-            if text.strip():
-                result = await llm_service.analyze_text(text.strip())
-                results.append({
-                    "text": text[:50] + "..." if len(text) > 50 else text,
-                    "analysis": result 
-                })
-            
-        return{
-            "results": results,
-            "count": len(results),
-            "status": "completed"
+def _pack_groups(texts: List[str]) -> List[List[int]]:
+    # Short texts are packed BATCH_PACK_SIZE at a time, long ones go on their own
+    groups = []
+    short = []
+    for i, text in enumerate(texts):
+        if len(text) <= config.BATCH_PACK_MAX_CHARS:
+            short.append(i)
+            if len(short) == config.BATCH_PACK_SIZE:
+                groups.append(short)
+                short = []
+        else:
+            groups.append([i])
+    if short:
+        groups.append(short)
+    return groups
+
+@router.post("/batch_process", dependencies=[Depends(concurrency_control)])
+async def batch_process(texts: List[str], req: Request, pack: bool = False):
+    if len(texts) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {config.BATCH_MAX_ITEMS} texts allowed per batch"
+        )
+
+    retry_after = await charge_rate_limit(req, len(texts))
+    if retry_after is not None:
+        raise rate_limited_error(retry_after)
+
+    logger.info("Processing batch of %d texts (pack=%s)", len(texts), pack)
+
+    llm_service = req.app.state.llm_service
+    semaphore = asyncio.Semaphore(config.BATCH_CONCURRENCY)
+    cleaned = [text.strip() for text in texts]
+    results: List[Optional[Dict]] = [None] * len(texts)
+
+    def record_error(i: int, error: str) -> None:
+        results[i] = {
+            "index": i,
+            "text": _preview(texts[i]),
+            "status": "error",
+            "error": error
         }
-    
-    except Exception as e:
-        logger.error(f"Batch processing error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+
+    def record_success(i: int, analysis: Dict) -> None:
+        results[i] = {
+            "index": i,
+            "text": _preview(texts[i]),
+            "status": "success",
+            "analysis": analysis
+        }
+
+    async def run_group(indices: List[int]) -> None:
+        wait_start = time.perf_counter()
+        async with semaphore:
+            STAGE_LATENCY.labels("queue_wait").observe(time.perf_counter() - wait_start)
+            try:
+                if len(indices) == 1:
+                    analyses = [await llm_service.analyze_text(cleaned[indices[0]])]
+                else:
+                    analyses = await llm_service.analyze_packed([cleaned[i] for i in indices])
+                for i, analysis in zip(indices, analyses):
+                    record_success(i, analysis)
+            except Exception as e:
+                logger.error("Batch item error: %s", e)
+                for i in indices:
+                    record_error(i, str(e))
+
+    valid = [i for i, text in enumerate(cleaned) if text]
+    for i, text in enumerate(cleaned):
+        if not text:
+            record_error(i, "Text cannot be empty or just whitespace")
+
+    if pack:
+        groups = _pack_groups([cleaned[i] for i in valid])
+        groups = [[valid[j] for j in group] for group in groups]
+    else:
+        groups = [[i] for i in valid]
+
+    try:
+        await cancel_on_disconnect(req, asyncio.gather(*(run_group(group) for group in groups)))
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    return FastJSONResponse({
+        "results": results,
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "status": "completed" if succeeded == len(results) else "partial"
+    })
+
+MAX_STREAM_TEXT_LENGTH = 5000
+MAX_STREAM_LINE_BYTES = 64 * 1024
+
+class _DuplexStreamingResponse(StreamingResponse):
+    # The response body is produced while the request body is still being read,
+    # so the disconnect listener must not consume receive() messages until then
+    def __init__(self, content, body_consumed: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_consumed = body_consumed
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self.body_consumed.wait()
+        await super().listen_for_disconnect(receive)
+
+async def _iter_body_lines(req: Request) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in req.stream():
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            yield line.decode("utf-8", errors="replace")
+        if len(buffer) > MAX_STREAM_LINE_BYTES:
+            raise ValueError(f"Input line exceeds {MAX_STREAM_LINE_BYTES} bytes")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace")
+
+async def _iter_stream_items(req: Request) -> AsyncIterator[Tuple[int, Optional[str], Dict]]:
+    # Yields (index, text, extra); text is None when the line could not be used
+    is_ndjson = "json" in req.headers.get("content-type", "")
+    index = 0
+
+    async for line in _iter_body_lines(req):
+        line = line.strip()
+        if not line:
+            continue
+
+        extra = {}
+        if is_ndjson:
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                yield index, None, {"error": "Invalid JSON line"}
+                index += 1
+                continue
+            if isinstance(item, dict):
+                if "id" in item:
+                    extra["id"] = item["id"]
+                item = item.get("text")
+            if not isinstance(item, str):
+                yield index, None, {**extra, "error": "Expected a string or an object with a 'text' field"}
+                index += 1
+                continue
+            text = item.strip()
+        else:
+            text = line
+
+        if not text:
+            yield index, None, {**extra, "error": "Text cannot be empty or just whitespace"}
+        elif len(text) > MAX_STREAM_TEXT_LENGTH:
+            yield index, None, {**extra, "error": f"Text exceeds {MAX_STREAM_TEXT_LENGTH} characters"}
+        else:
+            yield index, text, extra
+        index += 1
+
+def _format_stream_event(item: Dict, use_sse: bool, event: str = "result") -> str:
+    payload = json.dumps(item)
+    if use_sse:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@router.post("/batch_process/stream", dependencies=[Depends(concurrency_control)])
+async def batch_process_stream(req: Request, format: Optional[str] = None):
+    if format is None:
+        format = "sse" if "text/event-stream" in req.headers.get("accept", "") else "ndjson"
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    use_sse = format == "sse"
+
+    llm_service = req.app.state.llm_service
+    concurrency = config.BATCH_CONCURRENCY
+    body_consumed = asyncio.Event()
+
+    async def stream_results() -> AsyncIterator[str]:
+        # A slot is held from read until the result is queued, so at most
+        # `concurrency` items are in memory and reading stalls when the client does
+        slots = asyncio.Semaphore(concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        counts = {"count": 0, "succeeded": 0, "failed": 0}
+        input_failed = False
+
+        async def analyze(index: int, text: str, extra: Dict) -> None:
+            try:
+                analysis = await llm_service.analyze_text(text)
+                item = {"index": index, **extra, "text": _preview(text), "status": "success", "analysis": analysis}
+            except Exception as e:
+                logger.error("Stream item error: %s", e)
+                item = {"index": index, **extra, "text": _preview(text), "status": "error", "error": str(e)}
+            try:
+                await queue.put(item)
+            finally:
+                slots.release()
+
+        async def produce() -> None:
+            tasks = set()
+            try:
+                try:
+                    async for index, text, extra in _iter_stream_items(req):
+                        wait_start = time.perf_counter()
+                        await slots.acquire()
+                        STAGE_LATENCY.labels("queue_wait").observe(time.perf_counter() - wait_start)
+                        if text is not None:
+                            retry_after = await charge_rate_limit(req)
+                            if retry_after is not None:
+                                text = None
+                                extra = {**extra, "error": "Rate limit exceeded", "retry_after": round(retry_after, 1)}
+                        if text is None:
+                            try:
+                                await queue.put({"index": index, **extra, "status": "error"})
+                            finally:
+                                slots.release()
+                            continue
+                        task = asyncio.create_task(analyze(index, text, extra))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                finally:
+                    body_consumed.set()
+                # wait() rather than gather(): a cancelled gather cancels the analyses
+                # itself, so none would still be pending to count below
+                if tasks:
+                    await asyncio.wait(tasks)
+            except (asyncio.CancelledError, ClientDisconnect) as e:
+                # The client left mid-stream: analyses nobody will read are cancelled
+                # below, and the response notices the disconnect and stops on its own
+                ANALYSES_CANCELLED.labels("client_disconnect").inc(sum(1 for task in tasks if not task.done()))
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                return
+            except Exception as e:
+                logger.error("Stream input error: %s", e)
+                await queue.put({"status": "error", "error": str(e)})
+            finally:
+                for task in tasks:
+                    task.cancel()
+            # Not in the finally: after a cancellation nothing reads the queue,
+            # so a put on a full queue would never return
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if "index" in item:
+                    counts["count"] += 1
+                    counts["succeeded" if item["status"] == "success" else "failed"] += 1
+                else:
+                    # The input itself broke off; no item stands for it
+                    input_failed = True
+                yield _format_stream_event(item, use_sse)
+
+            status = "completed_with_errors" if counts["failed"] or input_failed else "completed"
+            yield _format_stream_event({"type": "summary", **counts, "status": status}, use_sse, event="done")
+        finally:
+            producer.cancel()
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return _DuplexStreamingResponse(stream_results(), body_consumed, media_type=media_type)
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from typing import Optional
+import json
+import logging
+import uuid
+
+from app.dependencies import charge_rate_limit
+from app.services.live_analysis import LiveAnalysisSession
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+MAX_SEGMENT_LENGTH = 5000
+
+@router.websocket("/ws/analyze")
+async def analyze_stream(websocket: WebSocket, session_id: Optional[str] = Query(None, max_length=128)):
+    # Same limit as TextRequest.session_id; FastAPI closes the socket with 1008 past it
+    await websocket.accept()
+
+    session_id = session_id or uuid.uuid4().hex
+    session = LiveAnalysisSession(
+        websocket.app.state.llm_service,
+        websocket.send_json,
+        session_id,
+        websocket.app.state.session_aggregator,
+        websocket.app.state.preprocessor,
+        # Same per-client budget as the HTTP routes, one token per analysis
+        admit=lambda: charge_rate_limit(websocket)
+    )
+    logger.info("Live analysis session %s opened", session_id)
+    await websocket.send_json({"type": "ready", "session_id": session_id})
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "error": "Invalid JSON"})
+                continue
+
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "error": "Expected a JSON object"})
+                continue
+
+            if message.get("type") == "ping":
+                await websocket.send_json({"type": "pong"})
+                continue
+
+            text = message.get("text")
+            if not isinstance(text, str) or not text.strip():
+                await websocket.send_json({"type": "error", "error": "Text cannot be empty or just whitespace"})
+                continue
+
+            text = text.strip()
+            if len(text) > MAX_SEGMENT_LENGTH:
+                await websocket.send_json({"type": "error", "error": f"Text exceeds {MAX_SEGMENT_LENGTH} characters"})
+                continue
+
+            await session.handle_segment(
+                text,
+                bool(message.get("is_final", False)),
+                message.get("segment_id")
+            )
+
+    except WebSocketDisconnect:
+        logger.info("Live analysis session %s closed by client", session_id)
+    finally:
+        await session.close()
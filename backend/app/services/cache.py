@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+def make_cache_key(text: str, model: str, prompt_version: str) -> str:
+    payload = f"{model}\x00{prompt_version}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict, ttl_seconds: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CacheBackend:
+
+    name = "none"
+
+    async def get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Dict, ttl_seconds: float) -> None:
+        raise NotImplementedError
+
+    # Live entries that expire last, with their remaining TTL, for warming
+    # the in-memory tier at startup
+    async def recent(self, limit: int) -> List[Tuple[str, Dict, float]]:
+        return []
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+
+    name = "sqlite"
+
+    # Expired rows are purged every PURGE_INTERVAL writes rather than on every set
+    PURGE_INTERVAL = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+        self._writes = 0
+
+    def _get(self, key: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Dict, ttl_seconds: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl_seconds)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_INTERVAL == 0:
+            self._conn.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (time.time(),))
+        self._conn.commit()
+
+    def _recent(self, limit: int) -> List[Tuple[str, Dict, float]]:
+        now = time.time()
+        rows = self._conn.execute(
+            "SELECT key, value, expires_at FROM analysis_cache WHERE expires_at > ? "
+            "ORDER BY expires_at DESC LIMIT ?",
+            (now, limit)
+        ).fetchall()
+        return [(key, json.loads(value), expires_at - now) for key, value, expires_at in rows]
+
+    async def get(self, key: str) -> Optional[Dict]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, key)
+
+    async def recent(self, limit: int) -> List[Tuple[str, Dict, float]]:
+        async with self._lock:
+            return await asyncio.to_thread(self._recent, limit)
+
+    async def set(self, key: str, value: Dict, ttl_seconds: float) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, value, ttl_seconds)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class RedisCacheBackend(CacheBackend):
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "aura:analysis:"):
+        # Any client exposing async get(key) and set(key, value, ex=seconds) works,
+        # so a local stand-in can replace a real Redis server
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise ValueError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        return cls(redis_asyncio.from_url(url))
+
+    async def get(self, key: str) -> Optional[Dict]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Dict, ttl_seconds: float) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl_seconds)))
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+class ResultCache:
+
+    def __init__(self, max_entries: int, ttl_seconds: float, backend: Optional[CacheBackend] = None):
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+        self.backend_hits = 0
+        self.backend_misses = 0
+        self.backend_errors = 0
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = self.memory.get(key)
+        if value is not None or self.backend is None:
+            return value
+
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning("Cache backend get failed: %s", e)
+            return None
+
+        if value is None:
+            self.backend_misses += 1
+            return None
+
+        self.backend_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Dict) -> None:
+        self.memory.set(key, value)
+        if self.backend is None:
+            return
+
+        try:
+            await self.backend.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning("Cache backend set failed: %s", e)
+
+    async def warm_up(self, limit: int) -> int:
+        if self.backend is None or limit <= 0:
+            return 0
+        # Oldest first, so the freshest entries end up most recently used
+        entries = await self.backend.recent(min(limit, self.memory.max_entries))
+        for key, value, ttl_seconds in reversed(entries):
+            self.memory.set(key, value, ttl_seconds)
+        return len(entries)
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> Dict:
+        stats = self.memory.stats()
+        stats["backend"] = {
+            "type": self.backend.name if self.backend else "none",
+            "hits": self.backend_hits,
+            "misses": self.backend_misses,
+            "errors": self.backend_errors,
+        }
+        return stats
+
+
+def create_result_cache() -> Optional[ResultCache]:
+    if not config.CACHE_ENABLED:
+        return None
+
+    backend_type = config.CACHE_BACKEND.lower()
+    if backend_type == "sqlite":
+        backend = SQLiteCacheBackend(config.CACHE_SQLITE_PATH)
+    elif backend_type == "redis":
+        backend = RedisCacheBackend.from_url(config.CACHE_REDIS_URL)
+    elif backend_type in ("", "none") and config.WORKERS > 1:
+        # Per-process LRUs alone would fragment the cache across workers
+        backend = SQLiteCacheBackend(config.CACHE_SQLITE_PATH)
+    elif backend_type in ("", "none", "memory"):
+        backend = None
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {config.CACHE_BACKEND}")
+
+    logger.info(
+        "Result cache enabled (max_entries=%s, ttl=%ss, backend=%s)",
+        config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS, backend.name if backend else "none"
+    )
+    return ResultCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS, backend)
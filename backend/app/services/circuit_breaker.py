@@ -0,0 +1,143 @@
+import logging
+import random
+import time
+from collections import deque
+from typing import Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.half_open_started = 0.0
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        now = time.monotonic()
+
+        if self.state == OPEN:
+            if now - self.opened_at < self.recovery_timeout:
+                self.rejected += 1
+                return False
+            self._transition(HALF_OPEN)
+            self.half_open_calls = 0
+            self.half_open_started = now
+
+        if self.state == HALF_OPEN:
+            # A trial call that never reported back (e.g. cancelled) must not
+            # wedge the breaker, so trial slots are refreshed after a timeout
+            if now - self.half_open_started >= self.recovery_timeout:
+                self.half_open_calls = 0
+                self.half_open_started = now
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected += 1
+                return False
+            self.half_open_calls += 1
+
+        return True
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != OPEN:
+                self.times_opened += 1
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning("Circuit breaker %s -> %s", self.state, state)
+        self.state = state
+
+    def stats(self) -> Dict:
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+        return {
+            "state": self.state,
+            "state_code": STATE_CODES[self.state],
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "times_opened": self.times_opened,
+            "rejected_requests": self.rejected,
+            "retry_in_seconds": round(retry_in, 2),
+        }
+
+
+class RetryBudget:
+
+    # Retries are allowed while they stay under `ratio` of recent requests, with
+    # a floor of `min_per_second` so low traffic can still retry at all
+    def __init__(self, ratio: float, min_per_second: float, window_seconds: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.exhausted = 0
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._requests and self._requests[0] < cutoff:
+            self._requests.popleft()
+        while self._retries and self._retries[0] < cutoff:
+            self._retries.popleft()
+
+    def record_request(self) -> None:
+        now = time.monotonic()
+        self._trim(now)
+        self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+
+        allowed = max(self.min_per_second * self.window_seconds, self.ratio * len(self._requests))
+        if len(self._retries) >= allowed:
+            self.exhausted += 1
+            return False
+
+        self._retries.append(now)
+        return True
+
+    def stats(self) -> Dict:
+        self._trim(time.monotonic())
+        return {
+            "ratio": self.ratio,
+            "window_seconds": self.window_seconds,
+            "requests_in_window": len(self._requests),
+            "retries_in_window": len(self._retries),
+            "exhausted": self.exhausted,
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # "Full jitter": spreads retries out so recovering upstreams are not stampeded
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,61 @@
+import logging
+from typing import Dict
+
+import httpx
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(config.REQUEST_TIMEOUT, pool=config.HTTP_POOL_TIMEOUT)
+
+    logger.info(
+        "Creating shared HTTP pool (max_connections=%s, max_keepalive=%s)",
+        limits.max_connections, limits.max_keepalive_connections
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def pool_stats(client: httpx.AsyncClient) -> Dict:
+    stats = {
+        "max_connections": config.HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "connections": 0,
+        "active": 0,
+        "idle": 0,
+        "queued_requests": 0,
+    }
+
+    if client is None or client.is_closed:
+        return stats
+
+    # httpx does not expose pool usage publicly, so read it off the httpcore
+    # pool. These are private attributes, so anything missing in the installed
+    # httpcore leaves that stat out instead of failing /metrics
+    pool = getattr(client._transport, "_pool", None)
+    if pool is None:
+        return stats
+
+    try:
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        stats["connections"] = len(connections)
+        stats["idle"] = idle
+        stats["active"] = len(connections) - idle
+
+        # RequestStatus.is_queued() only exists from httpcore 1.0.3
+        requests = list(getattr(pool, "_requests", []))
+        if all(hasattr(request, "is_queued") for request in requests):
+            stats["queued_requests"] = sum(1 for request in requests if request.is_queued())
+        else:
+            del stats["queued_requests"]
+    except Exception as e:
+        logger.debug("Could not read HTTP pool stats: %s", e)
+    return stats
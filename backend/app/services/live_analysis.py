@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.config import config
+from app.services.metrics import ANALYSES_CANCELLED
+
+logger = logging.getLogger(__name__)
+
+live_stats = {
+    "active_sessions": 0,
+    "segments_received": 0,
+    "analyses_sent": 0,
+    "superseded_analyses": 0,
+    "skipped_interims": 0,
+    "rate_limited": 0,
+}
+
+
+class LiveAnalysisSession:
+
+    def __init__(self, llm_service, send: Callable[[Dict], Awaitable[None]], session_id: str,
+                 aggregator=None, preprocessor=None,
+                 admit: Optional[Callable[[], Awaitable[Optional[float]]]] = None):
+        self.llm_service = llm_service
+        # Charged once per analysis that actually runs; returns the retry delay when refused
+        self.admit = admit
+        self.aggregator = aggregator
+        self.preprocessor = preprocessor
+        self.send = send
+        self.session_id = session_id
+        self.debounce_seconds = config.WS_INTERIM_DEBOUNCE_MS / 1000
+        self.min_interim_chars = config.WS_INTERIM_MIN_CHARS
+
+        self._seq = 0
+        self._closed = False
+        self._last_interim_text = ""
+        # Debounce wait + analysis of the latest interim text; replaced by newer text
+        self._interim_task: Optional[asyncio.Task] = None
+        self._final_tasks: Set[asyncio.Task] = set()
+
+        live_stats["active_sessions"] += 1
+
+    async def handle_segment(self, text: str, is_final: bool, segment_id=None) -> None:
+        live_stats["segments_received"] += 1
+        self._cancel_interim()
+
+        if is_final:
+            self._last_interim_text = ""
+            task = asyncio.create_task(self._analyze(text, True, segment_id))
+            self._final_tasks.add(task)
+            task.add_done_callback(self._final_tasks.discard)
+            return
+
+        # Interim updates from the recognizer are cumulative, so only the latest
+        # one matters; short or unchanged interims are not worth a round trip
+        if len(text) < self.min_interim_chars or text == self._last_interim_text:
+            live_stats["skipped_interims"] += 1
+            return
+
+        self._last_interim_text = text
+        self._interim_task = asyncio.create_task(self._debounced_interim(text, segment_id))
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        # Nobody is left to read these, so their upstream calls are dropped too
+        self._cancel_interim("websocket_closed")
+        for task in list(self._final_tasks):
+            if not task.done():
+                task.cancel()
+                ANALYSES_CANCELLED.labels("websocket_closed").inc()
+        live_stats["active_sessions"] -= 1
+
+    def _cancel_interim(self, reason: str = "superseded") -> None:
+        if self._interim_task is not None and not self._interim_task.done():
+            self._interim_task.cancel()
+            ANALYSES_CANCELLED.labels(reason).inc()
+            if reason == "superseded":
+                live_stats["superseded_analyses"] += 1
+        self._interim_task = None
+
+    async def _debounced_interim(self, text: str, segment_id) -> None:
+        await asyncio.sleep(self.debounce_seconds)
+        await self._analyze(text, False, segment_id)
+
+    async def _analyze(self, text: str, is_final: bool, segment_id) -> None:
+        self._seq += 1
+        seq = self._seq
+
+        if self.admit is not None:
+            retry_after = await self.admit()
+            if retry_after is not None:
+                live_stats["rate_limited"] += 1
+                # A refused interim is simply skipped; the final text follows anyway
+                if is_final and not self._closed:
+                    await self._deliver({
+                        "type": "error",
+                        "seq": seq,
+                        "is_final": is_final,
+                        "segment_id": segment_id,
+                        "error": "Rate limit exceeded",
+                        "retry_after": round(retry_after, 1)
+                    })
+                return
+
+        try:
+            if self.preprocessor is not None:
+                # Interim and final transcripts overlap, so only new segments get analyzed
+                analysis = await self.preprocessor.analyze(text, self.session_id)
+            else:
+                analysis = await self.llm_service.analyze_text(text)
+            # Interims are superseded by the final text, so only finals are aggregated
+            if is_final and self.aggregator is not None:
+                await self.aggregator.record_async(self.session_id, analysis)
+            message = {
+                "type": "analysis",
+                "seq": seq,
+                "is_final": is_final,
+                "segment_id": segment_id,
+                "analysis": analysis
+            }
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Live analysis error in session %s: %s", self.session_id, e)
+            message = {
+                "type": "error",
+                "seq": seq,
+                "is_final": is_final,
+                "segment_id": segment_id,
+                "error": str(e)
+            }
+
+        if self._closed:
+            return
+        if await self._deliver(message):
+            live_stats["analyses_sent"] += 1
+
+    async def _deliver(self, message: Dict) -> bool:
+        try:
+            await self.send(message)
+            return True
+        except Exception as e:
+            logger.debug("Could not deliver result to session %s: %s", self.session_id, e)
+            return False
@@ -1,164 +1,434 @@
 import json
 import logging
 import asyncio
-from typing import Dict, List
-from openai import OpenAI
+from typing import Dict, List, Optional, Tuple
+import httpx
 from app.config import config
+from app.services.http_pool import pool_stats
+from app.services.cache import ResultCache, make_cache_key
+from app.services import lexicon, local_scorer
+from app.services.usage import TokenUsageTracker
+from app.services.circuit_breaker import CircuitOpenError, RetryBudget, backoff_delay
+from app.services.metrics import FALLBACKS, LLM_CALLS_CANCELLED, LLM_RETRIES, LLM_TIMEOUTS, STAGE_LATENCY
+from app.services.micro_batcher import MicroBatcher
+from app.services.providers import ProviderRouter, create_provider_router
+from app.services.similarity_index import SimilarityIndex
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the prompt changes so cached results from the old prompt are not reused
+PROMPT_VERSION = "v2"
+
+VALID_EMOTIONS = frozenset(("joy", "sadness", "anger", "fear", "surprise", "disgust", "neutral"))
+VALID_SENTIMENT_TYPES = frozenset(("positive", "negative", "neutral"))
+
+# Identical on every request so the upstream can reuse its prompt prefix;
+# the per-request user message only carries the text
+SYSTEM_PROMPT = """You are a sentiment analysis expert. Always respond with valid JSON only, no additional text.
+
+Read the WHOLE text and judge its overall meaning, not isolated words:
+- Negations flip meaning: "not happy" is negative, "couldn't be happier" is positive.
+- Combinations reinforce: "promoted" + "happy" = strong joy.
+- Sarcasm is negative: "Oh great, another problem".
+- Identify what the speaker REALLY feels.
+
+Emotion guide (typical sentiment range):
+- joy (0.5 to 1.0): success, happiness, excitement, love, gratitude
+- sadness (-1.0 to -0.3): loss, loneliness, grief, disappointment
+- anger (-1.0 to -0.3): frustration, outrage, unfairness
+- fear (-0.5 to -0.2): worry, anxiety, panic, uncertainty
+- surprise: 0.3 to 0.7 with positive context, -0.5 to -0.2 with negative context, 0.1 to 0.3 alone; never exactly 0
+- disgust (-0.6 to -0.3): revulsion
+
+Output for a text:
+- sentiment: float from -1 (very negative) to 1 (very positive)
+- sentiment_type: "positive" if > 0.2, "negative" if < -0.2, else "neutral"
+- keywords: 3-5 most emotionally relevant words from the text
+- dominant_emotion: one of joy, sadness, anger, fear, surprise, disgust, neutral
+
+Respond with exactly:
+{"sentiment": <float>, "sentiment_type": "<type>", "keywords": ["<word>", ...], "dominant_emotion": "<emotion>"}"""
+
 class LLMService:
     
-    def __init__(self):
-        if not config.OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY not configured")
-        
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
-        self.model = config.OPENAI_MODEL
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ResultCache] = None,
+        router: Optional[ProviderRouter] = None,
+        persist_similarity_index: bool = True
+    ):
+        self.http_client = http_client
+        self.router = router or create_provider_router(http_client)
+        # Results are cached per provider set, so changing providers starts a fresh cache
+        self.model = self.router.model_id
         self.timeout = config.REQUEST_TIMEOUT
         self.max_retries = config.MAX_RETRIES
+        self.request_deadline = config.REQUEST_DEADLINE_SECONDS
+        self.backoff_base = config.RETRY_BACKOFF_BASE
+        self.backoff_max = config.RETRY_BACKOFF_MAX
+        self.retry_budget = RetryBudget(
+            config.RETRY_BUDGET_RATIO,
+            config.RETRY_BUDGET_MIN_PER_SECOND,
+            config.RETRY_BUDGET_WINDOW_SECONDS
+        )
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.coalesced_requests = 0
+        self.cancelled_calls = 0
+        self.mode = config.ANALYSIS_MODE
+        self.local_confidence_threshold = config.LOCAL_CONFIDENCE_THRESHOLD
+        self.local_results = 0
+        self.local_escalations = 0
+        self.usage = TokenUsageTracker()
+        self.batcher: Optional[MicroBatcher] = None
+        if config.MICRO_BATCH_ENABLED:
+            self.batcher = MicroBatcher(
+                self._analyze_group_with_llm,
+                config.MICRO_BATCH_MAX_ITEMS,
+                config.MICRO_BATCH_WINDOW_MS / 1000
+            )
+        self.similarity_index: Optional[SimilarityIndex] = None
+        if config.SIMILARITY_INDEX_ENABLED:
+            self.similarity_index = SimilarityIndex(
+                config.SIMILARITY_INDEX_DIM,
+                config.SIMILARITY_INDEX_CAPACITY,
+                config.SIMILARITY_THRESHOLD,
+                config.SIMILARITY_MIN_CHARS,
+                namespace=f"{self.model}:{PROMPT_VERSION}",
+                # Processes would overwrite each other's rows in a shared file,
+                # so only a single-worker server keeps the index on disk
+                path=config.SIMILARITY_INDEX_PATH if persist_similarity_index and config.WORKERS == 1 else None
+            )
         
-        logger.info(f"Initialized OpenAI client with model: {self.model}")
+        logger.info("Initialized LLM providers: %s", self.model)
 
     async def analyze_text(self, text: str) -> Dict:
+        result, _ = await self.analyze_text_with_status(text)
+        return result
+
+    async def analyze_text_with_status(self, text: str) -> Tuple[Dict, bool]:
+        # Also reports whether the keyword fallback answered, for callers that
+        # must not treat such a result as final (the bulk CLI retries those rows)
+        if self.mode != "llm":
+            result = self._analyze_locally(text)
+            if result is not None:
+                return result, False
+
+        key = make_cache_key(text, self.model, PROMPT_VERSION)
+
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                logger.debug("Cache hit for analysis")
+                return dict(cached), False
+
+        # Single-flight: identical concurrent texts share one upstream call
+        # Nothing may await between the lookup and the registration, or an
+        # identical text arriving meanwhile would start a second call
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._analyze_and_store(text, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced_requests += 1
+            logger.debug("Joined in-flight analysis for identical text")
+
+        # Shield so one caller cancelling does not cancel the call for the
+        # others; the last one to leave cancels it, aborting the upstream request
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            result, is_fallback = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            self._release_waiter(key, task)
+            raise
+        return dict(result), is_fallback
+
+    def _release_waiter(self, key: str, task: asyncio.Task) -> None:
+        remaining = self._waiters.get(task, 0) - 1
+        if remaining > 0:
+            self._waiters[task] = remaining
+            return
+        self._waiters.pop(task, None)
+        if task.done():
+            return
+
+        # Unlisted right away so an identical text arriving before the task
+        # finishes unwinding starts a fresh call instead of joining a cancelled one
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        task.cancel()
+        self.cancelled_calls += 1
+        LLM_CALLS_CANCELLED.inc()
+        logger.debug("Cancelled analysis with no callers left waiting")
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._waiters.pop(task, None)
+
+    def _analyze_locally(self, text: str) -> Optional[Dict]:
+        result, confidence = local_scorer.score(text)
+
+        if self.mode == "local" or confidence >= self.local_confidence_threshold:
+            self.local_results += 1
+            logger.debug("Local analysis accepted (confidence=%s)", confidence)
+            return result
+
+        # Ambiguous text (sarcasm, mixed signals, unknown vocabulary) goes to the LLM
+        self.local_escalations += 1
+        logger.debug("Local analysis escalated to LLM (confidence=%s)", confidence)
+        return None
+
+    async def _analyze_and_store(self, text: str, key: str) -> Tuple[Dict, bool]:
+        probe = None
+        if self.similarity_index is not None:
+            probe = self.similarity_index.probe(text)
+            if probe is not None:
+                with STAGE_LATENCY.labels("similarity").time():
+                    similar = await self.similarity_index.search(probe)
+                if similar is not None:
+                    logger.debug("Reused result of a similar analyzed text")
+                    return similar, False
+
+        # Long texts go alone; packing them would mostly add output tokens to wait for
+        if self.batcher is not None and len(text) <= config.BATCH_PACK_MAX_CHARS:
+            result = await self.batcher.submit(text)
+        else:
+            result = await self._analyze_with_llm(text)
+        if result is None:
+            return self._generate_fallback_response(text), True
+
+        # Fallback results are never cached so a recovered upstream is used right away
+        if self.cache is not None:
+            await self.cache.set(key, result)
+        if probe is not None:
+            self.similarity_index.add(probe, result)
+        return result, False
+
+    async def analyze_packed(self, texts: List[str]) -> List[Dict]:
+        keys = [make_cache_key(text, self.model, PROMPT_VERSION) for text in texts]
+        results: List[Optional[Dict]] = [None] * len(texts)
+
+        if self.mode != "llm":
+            results = [self._analyze_locally(text) for text in texts]
+
+        if self.cache is not None:
+            for i, key in enumerate(keys):
+                if results[i] is not None:
+                    continue
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    results[i] = dict(cached)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        try:
+            packed = await self._call_packed([texts[i] for i in pending])
+        except Exception as e:
+            # The whole pack failed, so every item is retried individually
+            logger.warning("Packed analysis of %s texts failed, analyzing individually: %s", len(pending), e)
+            packed = [None] * len(pending)
+
+        retry = []
+        for i, result in zip(pending, packed):
+            if result is None:
+                retry.append(i)
+                continue
+            results[i] = result
+            if self.cache is not None:
+                await self.cache.set(keys[i], result)
+
+        if retry:
+            individual = await asyncio.gather(*(self.analyze_text(texts[i]) for i in retry))
+            for i, result in zip(retry, individual):
+                results[i] = result
+
+        logger.info("Analyzed %d of %d texts in one packed request", len(pending) - len(retry), len(pending))
+        return results
+
+    async def _analyze_group_with_llm(self, texts: List[str]) -> List[Optional[Dict]]:
+        # Flush target of the micro-batcher; None means "use the fallback"
+        if len(texts) == 1:
+            return [await self._analyze_with_llm(texts[0])]
+
+        try:
+            results = await self._call_packed(texts)
+        except Exception as e:
+            logger.warning("Micro-batch of %s texts failed, analyzing individually: %s", len(texts), e)
+            results = [None] * len(texts)
+
+        retry = [i for i, result in enumerate(results) if result is None]
+        if retry:
+            individual = await asyncio.gather(*(self._analyze_with_llm(texts[i]) for i in retry))
+            for i, result in zip(retry, individual):
+                results[i] = result
+        return results
+
+    async def _call_packed(self, texts: List[str]) -> List[Optional[Dict]]:
+        response = await self._call_upstream(
+            self._create_batch_prompt(texts),
+            self.request_deadline,
+            max_tokens=200 * len(texts)
+        )
+        items = response.get("results")
+        if not isinstance(items, list) or len(items) != len(texts):
+            raise ValueError(
+                f"Expected {len(texts)} results, got "
+                f"{len(items) if isinstance(items, list) else 'none'}"
+            )
+
+        # Items are validated one by one so a single bad entry only costs a retry of that text
+        validated: List[Optional[Dict]] = []
+        with STAGE_LATENCY.labels("validation").time():
+            for item in items:
+                try:
+                    validated.append(self._validate_response(item))
+                except Exception as e:
+                    logger.warning("Dropping invalid item from packed response: %s", e)
+                    validated.append(None)
+        return validated
+
+    async def _analyze_with_llm(self, text: str) -> Optional[Dict]:
         prompt = self._create_prompt(text)
-        retries = 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.request_deadline
+        self.retry_budget.record_request()
+        attempt = 0
         
-        while retries < self.max_retries:
+        while True:
             try:
-                result = await asyncio.wait_for(
-                    self._call_openai(prompt),
-                    timeout=self.timeout
-                )
+                result = await self._call_upstream(prompt, deadline - loop.time())
                 
-                validated_result = self._validate_response(result)
-                logger.info(f"Successfully analyzed text: sentiment={validated_result['sentiment']}")
+                with STAGE_LATENCY.labels("validation").time():
+                    validated_result = self._validate_response(result)
+                logger.info("Successfully analyzed text: sentiment=%s", validated_result["sentiment"])
                 return validated_result
                 
+            except CircuitOpenError:
+                logger.warning("Circuit breaker open, using fallback")
+                return None
+                
             except asyncio.TimeoutError:
-                logger.warning(f"OpenAI API timeout (attempt {retries + 1}/{self.max_retries})")
-                retries += 1
-                if retries >= self.max_retries:
-                    logger.error("Max retries reached, using fallback")
-                    return self._generate_fallback_response(text)
-                await asyncio.sleep(2 ** retries)
+                logger.warning("LLM API timeout (attempt %s/%s)", attempt + 1, self.max_retries)
+                LLM_TIMEOUTS.inc()
+                LLM_RETRIES.labels("timeout").inc()
                 
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON response from OpenAI: {str(e)}")
-                retries += 1
-                if retries >= self.max_retries:
-                    return self._generate_fallback_response(text)
-                await asyncio.sleep(2 ** retries)
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.error("Invalid response from LLM: %s", e)
+                LLM_RETRIES.labels("invalid_json").inc()
                 
             except Exception as e:
-                logger.error(f"OpenAI API error (attempt {retries + 1}): {str(e)}")
-                retries += 1
-                if retries >= self.max_retries:
-                    logger.error("Max retries reached, using fallback")
-                    return self._generate_fallback_response(text)
-                await asyncio.sleep(2 ** retries)
-
-    def _create_prompt(self, text: str) -> str:
-        return f"""
-        IMPORTANT: Read and analyze the ENTIRE text carefully. Consider the complete context, not just individual words. 
-        The overall meaning and emotion of the full sentence matters more than isolated keywords.
-        
-        Text to analyze: "{text}"
-        
-        ANALYSIS INSTRUCTIONS:
-        1. READ THE COMPLETE TEXT FIRST - understand the whole message
-        2. Consider the CONTEXT - words like "not happy" mean negative, not positive
-        3. Look for COMBINATIONS - "promoted" + "happy" together = strong joy
-        4. Understand NEGATIONS - "not sad", "no longer worried", "can't be happier"
-        5. Detect SARCASM - "Oh great, another problem" is negative, not positive
-        6. Identify TRUE EMOTION - what is the person REALLY feeling?
-        
-        COMPREHENSIVE EMOTION KEYWORDS GUIDE:
-        
-        JOY/POSITIVE (sentiment 0.5 to 1.0):
-        - Achievement: promoted, promotion, success, successful, accomplished, achievement, win, won, winning, victory, triumph
-        - Happiness: happy, happier, happiest, joy, joyful, delighted, cheerful, pleased, glad, elated, ecstatic, overjoyed, thrilled
-        - Excitement: excited, exciting, amazing, wonderful, fantastic, awesome, incredible, brilliant, spectacular, magnificent
-        - Love: love, loved, loving, adore, cherish, treasure, beloved, dear, caring, affection
-        - Gratitude: grateful, thankful, blessed, appreciate, fortunate, lucky
-        
-        SADNESS/NEGATIVE (sentiment -1.0 to -0.3):
-        - Loss: miss, missing, lost, gone, departed, abandoned, left, goodbye, farewell
-        - Loneliness: lonely, alone, isolated, empty, hollow, abandoned, forgotten, neglected, rejected
-        - Sadness: sad, unhappy, miserable, depressed, melancholy, gloomy, grief, mourn, cry, tears, heartbroken, devastated
-        - Disappointment: disappointed, failed, failure, unsuccessful, defeated, hopeless, despair, discouraged
-        
-        ANGER/NEGATIVE (sentiment -1.0 to -0.3):
-        - Frustration: frustrated, annoyed, irritated, aggravated, exasperated, fed up, tired of, sick of
-        - Anger: angry, mad, furious, rage, outraged, livid, irate, enraged, infuriated, pissed, upset
-        - Unfairness: unfair, unjust, unacceptable, ridiculous, absurd, stupid, wrong, terrible, horrible, awful
-        
-        FEAR/ANXIETY (sentiment -0.5 to -0.2):
-        - Worry: worried, anxious, nervous, uneasy, restless, tense, stressed, overwhelmed, concerned, troubled
-        - Fear: scared, frightened, afraid, terrified, horrified, panic, alarmed, fearful
-        - Uncertainty: uncertain, unsure, confused, doubtful, hesitant, insecure, vulnerable
-        
-        SURPRISE (sentiment varies based on context):
-        - Positive Surprise (sentiment 0.3 to 0.7): wow, amazing, unbelievable, incredible, astonishing (in positive context)
-        - Negative Surprise (sentiment -0.5 to -0.2): shocked, stunned, horrified (in negative context)
-        - Neutral Surprise (sentiment -0.1 to 0.1): unexpected, surprising, suddenly
-        - General: shocked, stunned, astonished, amazed, astounded, speechless, bewildered, startled
-        
-        IMPORTANT: Surprise should affect sentiment based on context:
-        - If surprise words appear with positive words → positive sentiment (0.3 to 0.7)
-        - If surprise words appear with negative words → negative sentiment (-0.5 to -0.2)
-        - If surprise appears alone → slight positive sentiment (0.1 to 0.3) as surprise is often mildly exciting
-        
-        DISGUST (sentiment -0.6 to -0.3):
-        - Revulsion: disgusting, gross, revolting, repulsive, vile, nasty, sickening, nauseating
-        
-        Analyze the COMPLETE CONTEXT of "{text}" and provide:
-        
-        1. Sentiment score: Float between -1 (very negative) and 1 (very positive)
-           - For SURPRISE: Don't leave at 0! Consider context to determine if positive or negative surprise
-        2. Sentiment type: "positive" if > 0.2, "negative" if < -0.2, else "neutral"
-        3. Keywords: 3-5 most emotionally relevant words
-        4. Dominant emotion: joy, sadness, anger, fear, surprise, disgust, or neutral
-        
-        Respond with ONLY valid JSON:
-        {{
-            "sentiment": [float between -1 and 1],
-            "sentiment_type": "[positive/negative/neutral]",
-            "keywords": ["word1", "word2", "word3"],
-            "dominant_emotion": "[joy/sadness/anger/fear/surprise/disgust/neutral]"
-        }}
-        """
-
-    async def _call_openai(self, prompt: str) -> Dict:
-        try:
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a sentiment analysis expert. Always respond with valid JSON only, no additional text."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3,
-                max_tokens=200,
-                n=1,
-                stop=None
-            )
+                logger.error("LLM API error (attempt %s): %s", attempt + 1, e)
+                LLM_RETRIES.labels("error").inc()
             
-            content = response.choices[0].message.content
-            logger.debug(f"OpenAI raw response: {content}")
+            attempt += 1
+            if attempt >= self.max_retries:
+                logger.error("Max retries reached, using fallback")
+                return None
             
-            return json.loads(content)
+            if not self.retry_budget.try_acquire():
+                logger.warning("Retry budget exhausted, using fallback")
+                return None
             
-        except Exception as e:
-            logger.error(f"OpenAI API call failed: {str(e)}")
-            raise
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            if loop.time() + delay >= deadline:
+                logger.warning("Request deadline reached, using fallback")
+                return None
+            await asyncio.sleep(delay)
+
+    async def _call_upstream(self, prompt: str, remaining: float, max_tokens: int = 200) -> Dict:
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        
+        # The router owns per-provider breakers, failover and hedging
+        completion = await self.router.complete(
+            SYSTEM_PROMPT,
+            prompt,
+            max_tokens,
+            timeout=min(self.timeout, remaining)
+        )
+        self.usage.record(
+            completion.prompt_tokens,
+            completion.completion_tokens,
+            completion.latency
+        )
+        return completion.content
+
+    def _create_prompt(self, text: str) -> str:
+        # The text is JSON-encoded so quotes and newlines cannot break out of it
+        return f"Text: {json.dumps(text, ensure_ascii=False)}"
+
+    def _create_batch_prompt(self, texts: List[str]) -> str:
+        numbered = "\n".join(
+            f"{i + 1}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts)
+        )
+        return (
+            f"Analyze each of these {len(texts)} texts independently.\n"
+            f"{numbered}\n"
+            'Respond with {"results": [...]} holding one analysis object per text, in the same order.'
+        )
+
+    def pool_stats(self) -> Dict:
+        return pool_stats(self.http_client)
+
+    def single_flight_stats(self) -> Dict:
+        return {
+            "in_flight": len(self._inflight),
+            "cancelled_calls": self.cancelled_calls,
+            "coalesced_requests": self.coalesced_requests
+        }
+
+    def breaker_stats(self) -> Dict:
+        return {
+            **self.router.stats(),
+            "retry_budget": self.retry_budget.stats()
+        }
+
+    def micro_batch_stats(self) -> Dict:
+        if self.batcher is None:
+            return {"enabled": False}
+        return self.batcher.stats()
+
+    async def warm_up(self, connections: int, cache_entries: int) -> None:
+        await self.router.warm_up(connections)
+        if self.cache is not None:
+            loaded = await self.cache.warm_up(cache_entries)
+            logger.info("Loaded %s cached results into memory", loaded)
+        if self.similarity_index is not None:
+            self.similarity_index.warm_up()
+
+    def similarity_stats(self) -> Dict:
+        if self.similarity_index is None:
+            return {"enabled": False}
+        return self.similarity_index.stats()
+
+    async def close(self) -> None:
+        if self.batcher is not None:
+            await self.batcher.close()
+        await self.router.close()
+        if self.similarity_index is not None:
+            self.similarity_index.close()
+
+    def usage_stats(self) -> Dict:
+        return {"prompt_version": PROMPT_VERSION, **self.usage.stats()}
+
+    def local_stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "confidence_threshold": self.local_confidence_threshold,
+            "local_results": self.local_results,
+            "escalated_to_llm": self.local_escalations
+        }
+
+    def cache_stats(self) -> Dict:
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
 
     def _validate_response(self, response: Dict) -> Dict:
         try:
@@ -168,10 +438,9 @@ class LLMService:
             validated["sentiment"] = max(-1, min(1, sentiment))
             
             # Get dominant emotion first to check for surprise
-            emotion = response.get("dominant_emotion", "").lower()
-            valid_emotions = ["joy", "sadness", "anger", "fear", "surprise", "disgust", "neutral"]
+            emotion = str(response.get("dominant_emotion", "")).lower()
             
-            if emotion not in valid_emotions:
+            if emotion not in VALID_EMOTIONS:
                 if validated["sentiment"] > 0.5:
                     emotion = "joy"
                 elif validated["sentiment"] > 0:
@@ -188,8 +457,8 @@ class LLMService:
                 validated["sentiment"] = 0.2
                 logger.debug("Adjusted neutral surprise to slight positive sentiment")
             
-            sentiment_type = response.get("sentiment_type", "").lower()
-            if sentiment_type not in ["positive", "negative", "neutral"]:
+            sentiment_type = str(response.get("sentiment_type", "")).lower()
+            if sentiment_type not in VALID_SENTIMENT_TYPES:
                 if validated["sentiment"] > 0.2:
                     sentiment_type = "positive"
                 elif validated["sentiment"] < -0.2:
@@ -210,159 +479,18 @@ class LLMService:
             if not validated["keywords"]:
                 validated["keywords"] = ["general"]
             
-            logger.debug(f"Validated response: {validated}")
             return validated
             
         except (KeyError, ValueError, TypeError) as e:
-            logger.error(f"Response validation error: {str(e)}")
-            raise ValueError(f"Invalid response format from OpenAI: {str(e)}")
+            logger.error("Response validation error: %s", e)
+            raise ValueError(f"Invalid response format from LLM: {str(e)}")
 
     def _generate_fallback_response(self, text: str) -> Dict:
-        logger.info("Using fallback sentiment analysis (OpenAI unavailable)")
+        logger.info("Using fallback sentiment analysis (LLM unavailable)")
+        FALLBACKS.inc()
         
-        text_lower = text.lower()
-        words = text_lower.split()
-        
-        # Comprehensive emotion word sets
-        joy_words = {
-            'happy', 'happier', 'happiest', 'joy', 'joyful', 'delighted', 'cheerful', 
-            'pleased', 'glad', 'elated', 'ecstatic', 'overjoyed', 'thrilled',
-            'excited', 'exciting', 'amazing', 'wonderful', 'fantastic', 'awesome', 
-            'promoted', 'promotion', 'success', 'successful', 'accomplished', 
-            'achievement', 'win', 'won', 'winning', 'victory', 'triumph',
-            'love', 'loved', 'loving', 'grateful', 'thankful', 'blessed'
-        }
-        
-        sadness_words = {
-            'sad', 'unhappy', 'miserable', 'depressed', 'melancholy', 'gloomy', 
-            'grief', 'mourn', 'cry', 'tears', 'heartbroken', 'devastated', 
-            'lonely', 'alone', 'isolated', 'empty', 'miss', 'missing', 'lost', 
-            'disappointed', 'failed', 'failure', 'hopeless', 'despair'
-        }
-        
-        anger_words = {
-            'angry', 'mad', 'furious', 'rage', 'outraged', 'livid', 'irate', 
-            'frustrated', 'annoyed', 'irritated', 'aggravated', 'exasperated',
-            'unfair', 'unacceptable', 'ridiculous', 'absurd', 'stupid', 'wrong', 
-            'terrible', 'horrible', 'awful', 'hate', 'despise'
-        }
-        
-        fear_words = {
-            'worried', 'anxious', 'nervous', 'uneasy', 'tense', 'stressed', 
-            'scared', 'frightened', 'afraid', 'terrified', 'horrified', 'panic',
-            'uncertain', 'unsure', 'confused', 'doubtful', 'insecure', 'fearful'
-        }
-        
-        surprise_words = {
-            'shocked', 'stunned', 'astonished', 'amazed', 'astounded', 
-            'speechless', 'bewildered', 'unexpected', 'surprising', 'wow', 
-            'whoa', 'unbelievable', 'incredible', 'startled', 'surprised'
-        }
-        
-        disgust_words = {
-            'disgusting', 'gross', 'revolting', 'repulsive', 'vile', 'nasty', 
-            'sickening', 'nauseating', 'yuck', 'ew', 'ugh'
-        }
-        
-        # Calculate scores
-        sentiment_score = 0
-        keywords = []
-        emotion_counts = {
-            'joy': 0,
-            'sadness': 0,
-            'anger': 0,
-            'fear': 0,
-            'surprise': 0,
-            'disgust': 0
-        }
-        
-        # Track if we have positive or negative context with surprise
-        has_positive_context = False
-        has_negative_context = False
-        
-        # Check for specific phrase patterns
-        if 'promoted' in text_lower and ('happy' in text_lower or 'happier' in text_lower):
-            sentiment_score = 0.8
-            emotion_counts['joy'] = 5
-            keywords = ['promoted', 'happier', 'work']
-        else:
-            for word in words:
-                clean_word = word.strip('.,!?;:"\'')
-                
-                if clean_word in joy_words:
-                    sentiment_score += 0.3
-                    emotion_counts['joy'] += 1
-                    has_positive_context = True
-                    if clean_word not in ['good', 'great']:
-                        keywords.append(clean_word)
-                elif clean_word in sadness_words:
-                    sentiment_score -= 0.3
-                    emotion_counts['sadness'] += 1
-                    has_negative_context = True
-                    keywords.append(clean_word)
-                elif clean_word in anger_words:
-                    sentiment_score -= 0.35
-                    emotion_counts['anger'] += 1
-                    has_negative_context = True
-                    keywords.append(clean_word)
-                elif clean_word in fear_words:
-                    sentiment_score -= 0.25
-                    emotion_counts['fear'] += 1
-                    has_negative_context = True
-                    keywords.append(clean_word)
-                elif clean_word in surprise_words:
-                    emotion_counts['surprise'] += 1
-                    # Surprise affects sentiment based on context
-                    if has_positive_context:
-                        sentiment_score += 0.2
-                    elif has_negative_context:
-                        sentiment_score -= 0.15
-                    else:
-                        # Default surprise is slightly positive (exciting)
-                        sentiment_score += 0.1
-                    keywords.append(clean_word)
-                elif clean_word in disgust_words:
-                    sentiment_score -= 0.3
-                    emotion_counts['disgust'] += 1
-                    has_negative_context = True
-                    keywords.append(clean_word)
-        
-        # Determine dominant emotion
-        dominant_emotion = max(emotion_counts, key=emotion_counts.get)
-        if emotion_counts[dominant_emotion] == 0:
-            dominant_emotion = 'neutral'
-        
-        if dominant_emotion == 'surprise':
-            # If surprise is dominant but sentiment is neutral, make it slightly positive
-            if abs(sentiment_score) < 0.1:
-                sentiment_score = 0.2  # Default surprise to slight positive
-            # Amplify surprise sentiment slightly
-            elif sentiment_score > 0:
-                sentiment_score = min(1, sentiment_score * 1.2)
-            else:
-                sentiment_score = max(-1, sentiment_score * 1.2)
-        
-        # Normalize sentiment score
-        sentiment_score = max(-1, min(1, sentiment_score))
-        
-        # Determine sentiment type
-        if sentiment_score > 0.2:
-            sentiment_type = "positive"
-        elif sentiment_score < -0.2:
-            sentiment_type = "negative"
-        else:
-            sentiment_type = "neutral"
-        
-        # Ensure we have keywords
-        if not keywords:
-            keywords = [w.strip('.,!?;:"\'') for w in words if len(w) > 3][:5]
-        
-        result = {
-            "sentiment": round(sentiment_score, 3),
-            "sentiment_type": sentiment_type,
-            "keywords": keywords[:5],
-            "dominant_emotion": dominant_emotion
-        }
+        with STAGE_LATENCY.labels("fallback").time():
+            result = lexicon.score_text(text)
         
-        logger.info(f"Fallback analysis result: {result}")
-        return result
\ No newline at end of file
+        logger.debug("Fallback analysis result: %s", result)
+        return result
@@ -0,0 +1,209 @@
+import math
+import re
+from typing import Dict, List, Tuple
+
+from app.config import config
+from app.services import lexicon
+
+# Words the keyword fallback never knew about, on the same scale as lexicon weights
+EXTRA_WORDS = {
+    'good': (lexicon.JOY, 0.25), 'great': (lexicon.JOY, 0.3), 'nice': (lexicon.JOY, 0.2),
+    'excellent': (lexicon.JOY, 0.35), 'perfect': (lexicon.JOY, 0.3), 'beautiful': (lexicon.JOY, 0.3),
+    'fun': (lexicon.JOY, 0.25), 'enjoy': (lexicon.JOY, 0.25), 'enjoyed': (lexicon.JOY, 0.25),
+    'like': (lexicon.JOY, 0.15), 'liked': (lexicon.JOY, 0.15), 'better': (lexicon.JOY, 0.2),
+    'best': (lexicon.JOY, 0.3), 'proud': (lexicon.JOY, 0.3), 'relieved': (lexicon.JOY, 0.2),
+    'thanks': (lexicon.JOY, 0.15), 'thank': (lexicon.JOY, 0.15),
+    'bad': (lexicon.SADNESS, -0.25), 'worse': (lexicon.SADNESS, -0.3), 'worst': (lexicon.ANGER, -0.35),
+    'sorry': (lexicon.SADNESS, -0.15), 'hurt': (lexicon.SADNESS, -0.3), 'upset': (lexicon.ANGER, -0.3),
+    'annoying': (lexicon.ANGER, -0.3), 'frustrating': (lexicon.ANGER, -0.3), 'hated': (lexicon.ANGER, -0.35),
+    'worry': (lexicon.FEAR, -0.25), 'fear': (lexicon.FEAR, -0.25),
+    'scary': (lexicon.FEAR, -0.25), 'surprise': (lexicon.SURPRISE, 0.0),
+}
+
+EMOJI = {
+    '😀': (lexicon.JOY, 0.3), '😃': (lexicon.JOY, 0.3), '😄': (lexicon.JOY, 0.3),
+    '😁': (lexicon.JOY, 0.3), '😊': (lexicon.JOY, 0.3), '🙂': (lexicon.JOY, 0.2),
+    '😍': (lexicon.JOY, 0.35), '🥰': (lexicon.JOY, 0.35), '😂': (lexicon.JOY, 0.3),
+    '❤': (lexicon.JOY, 0.3), '👍': (lexicon.JOY, 0.2), '🎉': (lexicon.JOY, 0.3),
+    ':)': (lexicon.JOY, 0.2), ':-)': (lexicon.JOY, 0.2), ':d': (lexicon.JOY, 0.3),
+    '😢': (lexicon.SADNESS, -0.3), '😭': (lexicon.SADNESS, -0.35), '😞': (lexicon.SADNESS, -0.3),
+    '😔': (lexicon.SADNESS, -0.3), '💔': (lexicon.SADNESS, -0.35), '🙁': (lexicon.SADNESS, -0.2),
+    ':(': (lexicon.SADNESS, -0.2), ':-(': (lexicon.SADNESS, -0.2),
+    '😠': (lexicon.ANGER, -0.35), '😡': (lexicon.ANGER, -0.35), '🤬': (lexicon.ANGER, -0.4),
+    '👎': (lexicon.ANGER, -0.2),
+    '😨': (lexicon.FEAR, -0.25), '😱': (lexicon.FEAR, -0.3), '😰': (lexicon.FEAR, -0.25),
+    '😮': (lexicon.SURPRISE, 0.0), '😲': (lexicon.SURPRISE, 0.0), '🤯': (lexicon.SURPRISE, 0.0),
+    '🤢': (lexicon.DISGUST, -0.3), '🤮': (lexicon.DISGUST, -0.35),
+}
+
+NEGATIONS = {
+    'not', 'no', 'never', 'none', 'nobody', 'nothing', 'neither', 'nor',
+    'nowhere', 'cannot', 'without', 'hardly',
+}
+# "couldn't be happier" is praise, so comparatives are left alone under negation
+NEGATION_EXEMPT = {'happier', 'better', 'best'}
+NEGATION_SCOPE = 3
+# Fraction of the original weight kept, with its sign flipped, for a negated word
+NEGATION_SCALAR = -0.6
+
+INTENSIFIERS = {
+    'very': 1.4, 'really': 1.3, 'so': 1.3, 'extremely': 1.7, 'absolutely': 1.6,
+    'totally': 1.5, 'completely': 1.5, 'super': 1.4, 'incredibly': 1.6, 'truly': 1.3,
+    'quite': 1.15, 'deeply': 1.4, 'seriously': 1.3,
+    'slightly': 0.5, 'somewhat': 0.6, 'kinda': 0.7, 'barely': 0.4, 'little': 0.6,
+    'bit': 0.6, 'mildly': 0.5,
+}
+
+# Clause weighting around "but": what follows it usually carries the real sentiment
+CONTRAST_WORDS = {'but', 'however', 'although', 'though'}
+BEFORE_CONTRAST = 0.5
+AFTER_CONTRAST = 1.5
+
+SARCASM_RE = re.compile(
+    r"\b(oh (great|perfect|wonderful|joy|fantastic)|yeah,? right|just (great|perfect|what i needed)|"
+    r"thanks a lot|how (wonderful|lovely|nice)|what a (surprise|shock)|big surprise|as if)\b"
+)
+
+TOKEN_RE = re.compile(
+    r"[:;]-?[()d]|[a-z0-9]+(?:'[a-z]+)?|[.!?;,]|[\u2600-\u27bf\U0001f300-\U0001faff]"
+)
+
+# Raw scores are squashed into [-1, 1]; one plain lexicon word lands near 0.6
+NORMALIZATION_ALPHA = 0.15
+
+SHORT_TEXT_TOKENS = 3
+
+
+def _lookup(token: str):
+    entry = lexicon.TOKEN_TABLE.get(token)
+    if entry is not None:
+        return entry
+    entry = EXTRA_WORDS.get(token)
+    if entry is not None:
+        return entry
+    return EMOJI.get(token)
+
+
+def score(text: str) -> Tuple[Dict, float]:
+    text_lower = text.lower()
+    tokens = TOKEN_RE.findall(text_lower)
+
+    raw_score = 0.0
+    emotion_weights = [0.0] * len(lexicon.EMOTIONS)
+    keywords: List[str] = []
+    positive = 0
+    negative = 0
+    surprise_hits = 0
+
+    negation_left = 0
+    multiplier = 1.0
+    clause_weight = 1.0
+    word_count = 0
+
+    for token in tokens:
+        if token in '.!?;,':
+            negation_left = 0
+            multiplier = 1.0
+            continue
+
+        word_count += 1
+
+        if token in CONTRAST_WORDS:
+            # Everything seen so far is down-weighted in favour of the next clause
+            raw_score *= BEFORE_CONTRAST
+            emotion_weights = [weight * BEFORE_CONTRAST for weight in emotion_weights]
+            clause_weight = AFTER_CONTRAST
+            negation_left = 0
+            continue
+
+        if token in NEGATIONS or token.endswith("n't"):
+            negation_left = NEGATION_SCOPE
+            continue
+
+        intensity = INTENSIFIERS.get(token)
+        if intensity is not None:
+            multiplier *= intensity
+            continue
+
+        entry = _lookup(token)
+        if entry is None:
+            if negation_left:
+                negation_left -= 1
+            continue
+
+        emotion, weight = entry
+        keywords.append(token)
+
+        if emotion == lexicon.SURPRISE:
+            surprise_hits += 1
+            weight = 0.2 if raw_score > 0 else -0.15 if raw_score < 0 else 0.1
+
+        weight *= multiplier * clause_weight
+        multiplier = 1.0
+
+        if negation_left and token not in NEGATION_EXEMPT:
+            weight *= NEGATION_SCALAR
+            if emotion == lexicon.JOY:
+                emotion = lexicon.SADNESS
+            elif emotion != lexicon.SURPRISE:
+                emotion = -1
+            negation_left = 0
+
+        raw_score += weight
+        if emotion >= 0:
+            emotion_weights[emotion] += abs(weight)
+
+        if weight > 0:
+            positive += 1
+        elif weight < 0:
+            negative += 1
+
+    sentiment = raw_score / math.sqrt(raw_score * raw_score + NORMALIZATION_ALPHA)
+
+    best = max(range(len(emotion_weights)), key=emotion_weights.__getitem__)
+    dominant_emotion = lexicon.EMOTIONS[best] if emotion_weights[best] > 0 else "neutral"
+
+    if dominant_emotion == "surprise" and abs(sentiment) < 0.1:
+        sentiment = 0.2
+
+    sentiment = max(-1.0, min(1.0, sentiment))
+
+    if sentiment > 0.2:
+        sentiment_type = "positive"
+    elif sentiment < -0.2:
+        sentiment_type = "negative"
+    else:
+        sentiment_type = "neutral"
+
+    if not keywords:
+        keywords = [token for token in tokens if len(token) > 3][:config.MAX_KEYWORDS]
+    if not keywords:
+        keywords = ["general"]
+
+    result = {
+        "sentiment": round(sentiment, 3),
+        "sentiment_type": sentiment_type,
+        "keywords": list(dict.fromkeys(keywords))[:config.MAX_KEYWORDS],
+        "dominant_emotion": dominant_emotion
+    }
+    return result, _confidence(text_lower, word_count, positive, negative, surprise_hits)
+
+
+def _confidence(text_lower: str, word_count: int, positive: int, negative: int, surprise_hits: int) -> float:
+    signals = positive + negative
+
+    if signals == 0:
+        # Fillers like "yeah" or "okay" are safely neutral; longer text with no
+        # known words probably uses vocabulary the lexicon does not cover
+        if word_count <= SHORT_TEXT_TOKENS and not surprise_hits:
+            return 0.9
+        return 0.3
+
+    agreement = abs(positive - negative) / signals
+    evidence = min(1.0, 0.55 + 0.15 * signals)
+    confidence = agreement * evidence
+
+    if SARCASM_RE.search(text_lower):
+        confidence *= 0.3
+
+    return round(confidence, 3)
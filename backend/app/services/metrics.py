@@ -0,0 +1,382 @@
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Metrics are updated from the event loop thread, so plain integer and float
+# updates are safe without locks and cost a dict lookup at most. The one
+# exception is log_records_dropped_total: the log handler increments it from
+# whichever thread logs, always under that handler's lock, and nothing else
+# writes to it. A metric updated from another thread needs the same guarantee
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class _CounterChild:
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        self.value += 1
+        try:
+            yield
+        finally:
+            self.value -= 1
+
+
+class _HistogramChild:
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        # One slot per bound plus a final +Inf slot; counts are not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Linear interpolation inside the bucket holding the q-th observation,
+        # the same estimate Prometheus' histogram_quantile() makes
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def summary(self) -> Dict:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 2)
+
+        return {
+            "count": self.count,
+            "avg_ms": ms(self.sum / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.50)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+        }
+
+
+class _Metric:
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def empty_copy(self) -> "_Metric":
+        return type(self)(self.name, self.documentation, self.labelnames)
+
+    def labels(self, *values) -> object:
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._new_child()
+            self._children[key] = child
+        return child
+
+    def children(self) -> List[Tuple[Dict[str, str], object]]:
+        return [
+            (dict(zip(self.labelnames, key)), child)
+            for key, child in self._children.items()
+        ]
+
+
+class Counter(_Metric):
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    @property
+    def value(self) -> float:
+        return sum(child.value for child in self._children.values())
+
+
+class Gauge(_Metric):
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def track(self):
+        return self._default.track()
+
+    @property
+    def value(self) -> float:
+        return sum(child.value for child in self._children.values())
+
+
+class Histogram(_Metric):
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def empty_copy(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+class MetricsRegistry:
+
+    def __init__(self, namespace: str = "aura"):
+        self.namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> Dict:
+        # JSON-safe copy of every value, used to share metrics between worker processes
+        data = {}
+        for metric in self._metrics.values():
+            children = []
+            for key, child in metric._children.items():
+                if isinstance(child, _HistogramChild):
+                    children.append([list(key), {"counts": child.counts, "count": child.count, "sum": child.sum}])
+                else:
+                    children.append([list(key), child.value])
+            data[metric.name] = {"type": metric.type_name, "children": children}
+        return data
+
+    def merged(self, snapshots: List[Dict]) -> "MetricsRegistry":
+        # Counters and histograms are summed; gauges too, so callers should
+        # leave gauges of workers that stopped reporting out of `snapshots`
+        merged = MetricsRegistry(self.namespace)
+        for metric in self._metrics.values():
+            merged._register(metric.empty_copy())
+
+        for snapshot in snapshots:
+            for name, data in snapshot.items():
+                metric = merged.get(name)
+                if metric is None or data["type"] != metric.type_name:
+                    continue
+                for key, value in data["children"]:
+                    child = metric.labels(*key)
+                    if isinstance(child, _HistogramChild):
+                        if len(value["counts"]) != len(child.counts):
+                            continue
+                        for i, bucket_count in enumerate(value["counts"]):
+                            child.counts[i] += bucket_count
+                        child.count += value["count"]
+                        child.sum += value["sum"]
+                    else:
+                        child.value += value
+        return merged
+
+    def render_prometheus(self, extra_gauges: Optional[Dict[str, Dict]] = None) -> str:
+        lines: List[str] = []
+
+        for metric in self._metrics.values():
+            name = f"{self.namespace}_{metric.name}"
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+
+            for labels, child in metric.children():
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric.buckets, child.counts):
+                        cumulative += bucket_count
+                        bucket_labels = {**labels, "le": _format_value(bound)}
+                        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    bucket_labels = {**labels, "le": "+Inf"}
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {child.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {child.count}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(child.value)}")
+
+        # Component stats dicts (cache, pool, ...) are exported as flat gauges
+        for prefix, stats in (extra_gauges or {}).items():
+            for key, value in _flatten(stats):
+                name = f"{self.namespace}_{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in stats.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, bool):
+            yield name, float(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(value, name)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value)
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route and status", ("method", "path", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("path",)
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("path",)
+)
+STAGE_LATENCY = registry.histogram(
+    "analysis_stage_duration_seconds",
+    "Time spent per analysis stage (admission_wait, queue_wait, similarity, llm_call, validation, fallback)",
+    ("stage",)
+)
+LLM_IN_FLIGHT = registry.gauge(
+    "llm_requests_in_flight", "Upstream LLM calls currently in flight"
+)
+LLM_RETRIES = registry.counter(
+    "llm_retries_total", "Upstream LLM attempts that failed and were retried or gave up", ("reason",)
+)
+LLM_TIMEOUTS = registry.counter(
+    "llm_timeouts_total", "Upstream LLM attempts that hit REQUEST_TIMEOUT"
+)
+FALLBACKS = registry.counter(
+    "fallback_responses_total", "Analyses answered by the keyword fallback"
+)
+ADMISSION_REJECTIONS = registry.counter(
+    "admission_rejections_total", "Requests turned away by rate limiting or admission control", ("reason",)
+)
+PROVIDER_REQUESTS = registry.counter(
+    "llm_provider_requests_total", "Upstream LLM attempts by provider and outcome", ("provider", "outcome")
+)
+HEDGED_REQUESTS = registry.counter(
+    "llm_hedged_requests_total", "Hedged second-provider calls fired, and how many answered first", ("outcome",)
+)
+LOG_RECORDS_DROPPED = registry.counter(
+    "log_records_dropped_total", "Log records discarded because the async log queue was full"
+)
+SIMILARITY_LOOKUPS = registry.counter(
+    "similarity_index_lookups_total", "Nearest-neighbour lookups before an upstream call, by outcome", ("outcome",)
+)
+ANALYSES_CANCELLED = registry.counter(
+    "analyses_cancelled_total",
+    "Analyses abandoned before they finished (client_disconnect, websocket_closed, superseded)",
+    ("reason",)
+)
+LLM_CALLS_CANCELLED = registry.counter(
+    "llm_calls_cancelled_total", "In-flight upstream analyses aborted because every caller waiting on them left"
+)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+FlushFn = Callable[[List[str]], Awaitable[List[Optional[Dict]]]]
+
+
+class MicroBatcher:
+
+    # Collects texts for up to `window` seconds (or `max_items` texts) and
+    # hands them to `flush` as one group; each caller gets its own item back
+    def __init__(self, flush: FlushFn, max_items: int, window: float):
+        self._flush_fn = flush
+        self.max_items = max_items
+        self.window = window
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.flushed_full = 0
+        self.flushed_window = 0
+        self.largest_batch = 0
+
+    async def submit(self, text: str) -> Optional[Dict]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_items:
+            self.flushed_full += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_on_timer)
+
+        return await future
+
+    def _flush_on_timer(self) -> None:
+        self._timer = None
+        self.flushed_window += 1
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # Callers cancelled while waiting for the window are not sent upstream
+        batch = [(text, future) for text, future in self._pending if not future.cancelled()]
+        self._pending = []
+        if not batch:
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        for _, future in batch:
+            future.add_done_callback(lambda _: self._cancel_if_abandoned(task, batch))
+
+    def _cancel_if_abandoned(self, task: asyncio.Task, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Once every caller in the batch has given up, so has the upstream call
+        if not task.done() and all(future.cancelled() for _, future in batch):
+            task.cancel()
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            results = await self._flush_fn([text for text, _ in batch])
+        except Exception as e:
+            logger.error("Micro-batch of %s texts failed: %s", len(batch), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # A caller that gave up has a cancelled future, which is skipped
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": True,
+            "window_ms": round(self.window * 1000, 2),
+            "max_items": self.max_items,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "flushed_full": self.flushed_full,
+            "flushed_window": self.flushed_window,
+        }
@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_RE = re.compile(r"[^.!?…\n]+(?:[.!?…]+|\n+|$)")
+WORD_RE = re.compile(r"\S+")
+STRIP_CHARS = ".,!?;:\"'()[]{}…-"
+
+# Polynomial rolling hash over word hashes, modulo a Mersenne prime
+HASH_BASE = 1_000_003
+HASH_MOD = (1 << 61) - 1
+
+
+def split_sentences(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    # Sentence spans without surrounding whitespace; a sentence longer than
+    # max_chars is cut at whitespace so no piece exceeds it
+    spans: List[Tuple[int, int]] = []
+    for match in SENTENCE_RE.finditer(text):
+        start, end = match.span()
+        piece = text[start:end]
+        if not piece.strip():
+            continue
+        start += len(piece) - len(piece.lstrip())
+        end -= len(piece) - len(piece.rstrip())
+
+        while end - start > max_chars:
+            cut = text.rfind(" ", start, start + max_chars)
+            if cut <= start:
+                cut = start + max_chars
+            spans.append((start, cut))
+            start = cut + 1 if text[cut] == " " else cut
+        if start < end:
+            spans.append((start, end))
+    return spans
+
+
+def _words(text: str) -> Tuple[List[int], List[int]]:
+    # Hashes of normalized words plus the end offset of each word; interim and
+    # final transcripts differ in case and punctuation, which is ignored here
+    hashes, ends = [], []
+    for match in WORD_RE.finditer(text):
+        word = match.group().lower().strip(STRIP_CHARS)
+        if word:
+            hashes.append(hash(word) % HASH_MOD)
+            ends.append(match.end())
+    return hashes, ends
+
+
+def overlap_length(tail: List[int], words: List[int]) -> int:
+    # Longest k such that the last k words of `tail` equal the first k of `words`,
+    # found in one pass by comparing suffix and prefix rolling hashes
+    best = 0
+    prefix = suffix = 0
+    power = 1
+    for k in range(1, min(len(tail), len(words)) + 1):
+        prefix = (prefix * HASH_BASE + words[k - 1]) % HASH_MOD
+        suffix = (tail[-k] * power + suffix) % HASH_MOD
+        power = power * HASH_BASE % HASH_MOD
+        if prefix == suffix and tail[-k:] == words[:k]:
+            best = k
+    return best
+
+
+def _sentence_key(text: str) -> int:
+    # Case and punctuation are ignored, like in _words, so a final transcript
+    # still matches the interim that carried the same sentence
+    return hash(" ".join(filter(None, (word.lower().strip(STRIP_CHARS) for word in text.split()))))
+
+
+class _SessionHistory:
+
+    __slots__ = ("tail", "last_result", "sentences", "last_active", "lock")
+
+    def __init__(self):
+        self.tail: List[int] = []
+        self.last_result: Optional[Dict] = None
+        self.sentences: "OrderedDict[int, Dict]" = OrderedDict()
+        self.last_active = time.monotonic()
+        # Interim and final analyses of a session run concurrently; each one
+        # has to start from the history the previous one left behind
+        self.lock = asyncio.Lock()
+
+
+class TranscriptPreprocessor:
+
+    def __init__(self, llm_service, segment_chars: int, tail_words: int = 200,
+                 segment_memory: int = 256, max_sessions: int = 10000, idle_ttl: float = 1800):
+        self.llm_service = llm_service
+        self.segment_chars = segment_chars
+        self.tail_words = tail_words
+        self.segment_memory = segment_memory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, _SessionHistory]" = OrderedDict()
+
+        self.texts = 0
+        self.segments_total = 0
+        self.segments_analyzed = 0
+        self.segments_reused = 0
+        self.chars_skipped = 0
+
+    async def analyze(self, text: str, session_id: Optional[str] = None) -> Dict:
+        result, _ = await self.analyze_with_status(text, session_id)
+        return result
+
+    async def analyze_with_status(self, text: str, session_id: Optional[str] = None) -> Tuple[Dict, bool]:
+        # The flag is set when any segment was answered by the keyword fallback
+        if not session_id:
+            # The common case (short text, nothing to reuse) stays a single plain call
+            if len(text) <= self.segment_chars:
+                return await self.llm_service.analyze_text_with_status(text)
+            return await self._analyze(text, None)
+
+        history = self._history(session_id)
+        async with history.lock:
+            return await self._analyze(text, history)
+
+    async def _analyze(self, text: str, history: Optional[_SessionHistory]) -> Tuple[Dict, bool]:
+        self.texts += 1
+        sentences = split_sentences(text, self.segment_chars)
+
+        overlap_end = 0
+        words, ends = _words(text)
+        if history is not None and history.tail and history.last_result is not None:
+            overlap = overlap_length(history.tail, words)
+            if overlap:
+                overlap_end = ends[overlap - 1]
+
+        # Reuse is decided per sentence: one seen before keeps its result, and
+        # one lying entirely inside text this session already sent is covered
+        # by the previous merged result. Only the rest goes upstream; the
+        # sentence an interim cut off is sent again whole, since a fragment
+        # alone can read the opposite way ("I'm not" + "unhappy")
+        weighted: List[Tuple[Optional[Dict], float]] = []
+        pending: List[Tuple[int, int, int]] = []
+        for start, end in sentences:
+            sentence = text[start:end]
+            key = _sentence_key(sentence)
+            reused = history.sentences.get(key) if history is not None else None
+            if reused is None and end <= overlap_end:
+                reused = history.last_result
+
+            if reused is not None:
+                self.segments_reused += 1
+                self.chars_skipped += len(sentence)
+            else:
+                pending.append((len(weighted), start, end))
+            weighted.append((reused, end - start))
+
+        self.segments_total += len(sentences)
+        self.segments_analyzed += len(pending)
+
+        # Pending sentences that are neighbours in the text share one call
+        groups: List[List[Tuple[int, int, int]]] = []
+        for item in pending:
+            previous = groups[-1][-1] if groups else None
+            if (previous is not None and previous[0] + 1 == item[0]
+                    and item[2] - groups[-1][0][1] <= self.segment_chars):
+                groups[-1].append(item)
+            else:
+                groups.append([item])
+
+        results = await asyncio.gather(*(
+            self.llm_service.analyze_text_with_status(text[group[0][1]:group[-1][2]]) for group in groups
+        ))
+        any_fallback = False
+        for group, (result, is_fallback) in zip(groups, results):
+            any_fallback = any_fallback or is_fallback
+            for i, start, end in group:
+                weighted[i] = (result, weighted[i][1])
+                # Fallback answers are not remembered, like the cache, so the sentence is retried
+                if history is not None and not is_fallback:
+                    key = _sentence_key(text[start:end])
+                    history.sentences[key] = result
+                    history.sentences.move_to_end(key)
+                    if len(history.sentences) > self.segment_memory:
+                        history.sentences.popitem(last=False)
+
+        if not weighted:
+            merged, any_fallback = await self.llm_service.analyze_text_with_status(text)
+        elif len(groups) == 1 and len(groups[0]) == len(weighted):
+            # Nothing reused: the single upstream answer is the result as is
+            merged = results[0][0]
+        else:
+            merged = self._merge(weighted)
+
+        if history is not None:
+            history.tail = words[-self.tail_words:]
+            history.last_result = merged
+            history.last_active = time.monotonic()
+        return dict(merged), any_fallback
+
+    def _merge(self, weighted: List[Tuple[Dict, float]]) -> Dict:
+        total = sum(weight for _, weight in weighted) or 1.0
+        sentiment = sum(result["sentiment"] * weight for result, weight in weighted) / total
+
+        # Emotions are weighted by how much text carried them and how strongly
+        emotion_weights: Dict[str, float] = {}
+        keyword_weights: Dict[str, float] = {}
+        for result, weight in weighted:
+            emotion = result.get("dominant_emotion", "neutral")
+            strength = weight * (0.1 + abs(result.get("sentiment", 0.0)))
+            emotion_weights[emotion] = emotion_weights.get(emotion, 0.0) + strength
+            for rank, keyword in enumerate(result.get("keywords", [])):
+                keyword_weights[keyword] = keyword_weights.get(keyword, 0.0) + weight / (rank + 1)
+
+        merged = {
+            "sentiment": round(sentiment, 3),
+            "dominant_emotion": max(emotion_weights, key=emotion_weights.get),
+            "keywords": sorted(keyword_weights, key=keyword_weights.get, reverse=True)[:config.MAX_KEYWORDS],
+        }
+        # Same normalization as an upstream answer (sentiment_type, surprise rule, limits)
+        return self.llm_service._validate_response(merged)
+
+    def _history(self, session_id: str) -> _SessionHistory:
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_active >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+        history = self._sessions.get(session_id)
+        if history is None:
+            history = _SessionHistory()
+            self._sessions[session_id] = history
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return history
+
+    def stats(self) -> Dict:
+        return {
+            "segment_chars": self.segment_chars,
+            "tracked_sessions": len(self._sessions),
+            "texts": self.texts,
+            "segments_total": self.segments_total,
+            "segments_analyzed": self.segments_analyzed,
+            "segments_reused": self.segments_reused,
+            "chars_skipped": self.chars_skipped,
+        }
@@ -0,0 +1,516 @@
+import asyncio
+import importlib
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from app.config import config
+from app.services import local_scorer
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.metrics import HEDGED_REQUESTS, LLM_IN_FLIGHT, PROVIDER_REQUESTS, STAGE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+class Completion(NamedTuple):
+    content: Dict
+    provider: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+
+
+class LLMProvider:
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    # Returns the raw text plus prompt/completion token counts
+    async def complete(self, system_prompt: str, prompt: str, max_tokens: int) -> Tuple[str, int, int]:
+        raise NotImplementedError
+
+    # Loads whatever is loaded lazily and opens `connections` pooled
+    # connections to the upstream without spending tokens
+    async def warm_up(self, connections: int) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str, http_client: Optional[httpx.AsyncClient] = None,
+                 base_url: Optional[str] = None):
+        super().__init__(model)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.http_client = http_client
+        self._client = None
+
+    @property
+    def client(self):
+        # The SDK and the pydantic models behind it take most of a second to
+        # import, so that happens on first use (or warm-up), not at startup
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            # Retries are handled (and counted) by LLMService, not inside the SDK
+            self._client = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, http_client=self.http_client, max_retries=0
+            )
+        return self._client
+
+    async def warm_up(self, connections: int) -> None:
+        # Importing on the event loop would stall requests already being served
+        await asyncio.to_thread(importlib.import_module, "openai")
+        client = self.client
+        # Listing models is free; each concurrent call leaves a connection in the pool
+        await asyncio.gather(*(client.models.list() for _ in range(connections)))
+
+    async def complete(self, system_prompt: str, prompt: str, max_tokens: int) -> Tuple[str, int, int]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3,
+            max_tokens=max_tokens,
+            n=1,
+            stop=None
+        )
+
+        usage = response.usage
+        return (
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0
+        )
+
+
+class AnthropicProvider(LLMProvider):
+
+    name = "anthropic"
+    API_URL = "https://api.anthropic.com/v1/messages"
+    MODELS_URL = "https://api.anthropic.com/v1/models"
+    API_VERSION = "2023-06-01"
+
+    # Talks to the Messages API over the shared pool; the pinned SDK only
+    # exposes the legacy completions endpoint
+    def __init__(self, api_key: str, model: str, http_client: Optional[httpx.AsyncClient] = None):
+        super().__init__(model)
+        self.api_key = api_key
+        self._owns_client = http_client is None
+        self.client = http_client or httpx.AsyncClient()
+
+    async def complete(self, system_prompt: str, prompt: str, max_tokens: int) -> Tuple[str, int, int]:
+        response = await self.client.post(
+            self.API_URL,
+            headers={
+                "x-api-key": self.api_key,
+                "anthropic-version": self.API_VERSION,
+                "content-type": "application/json"
+            },
+            json={
+                "model": self.model,
+                "system": system_prompt,
+                # Prefilling "{" keeps the reply to bare JSON, there is no JSON mode
+                "messages": [
+                    {"role": "user", "content": prompt},
+                    {"role": "assistant", "content": "{"}
+                ],
+                "max_tokens": max_tokens,
+                "temperature": 0.3
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        text = "".join(block.get("text", "") for block in data.get("content", []))
+        usage = data.get("usage") or {}
+        return "{" + text, usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+    async def warm_up(self, connections: int) -> None:
+        # Any response means TCP and TLS are done and the connection is pooled
+        await asyncio.gather(*(
+            self.client.get(
+                self.MODELS_URL,
+                headers={"x-api-key": self.api_key, "anthropic-version": self.API_VERSION}
+            )
+            for _ in range(connections)
+        ))
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+
+class MockProviderError(Exception):
+    pass
+
+
+class MockProvider(LLMProvider):
+
+    name = "mock"
+
+    _SINGLE_RE = re.compile(r'^Text: (".*")$', re.S)
+    _NUMBERED_RE = re.compile(r'^\d+\. (".*")$', re.M)
+
+    # Answers with the local scorer after a simulated delay, so routing,
+    # hedging and benchmarks can run without network access or API keys
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 0,
+                 error_rate: float = 0.0, malformed_rate: float = 0.0, name: str = "mock"):
+        super().__init__("local-scorer")
+        self.name = name
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+
+    async def complete(self, system_prompt: str, prompt: str, max_tokens: int) -> Tuple[str, int, int]:
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if random.random() < self.error_rate:
+            raise MockProviderError("Simulated upstream error")
+        if random.random() < self.malformed_rate:
+            return "not json", len(prompt) // 4, 2
+
+        single = self._SINGLE_RE.match(prompt)
+        if single:
+            content = json.dumps(local_scorer.score(json.loads(single.group(1)))[0])
+        else:
+            texts = [json.loads(match) for match in self._NUMBERED_RE.findall(prompt)]
+            content = json.dumps({"results": [local_scorer.score(text)[0] for text in texts]})
+
+        return content, (len(system_prompt) + len(prompt)) // 4, len(content) // 4
+
+
+class ProviderStats:
+
+    def __init__(self, alpha: float, window: int = 200, reprobe_after: float = 30.0):
+        self.alpha = alpha
+        self.reprobe_after = reprobe_after
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error_rate = 0.0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._p95: Optional[float] = None
+        self._last_sample: Optional[float] = None
+
+        self.requests = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self.hedges_lost = 0
+        self.reprobes = 0
+
+    def _update_latency(self, latency: float) -> None:
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+        self._last_sample = time.monotonic()
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self._update_latency(latency)
+        self.ewma_error_rate -= self.alpha * self.ewma_error_rate
+        self._latencies.append(latency)
+        self._p95 = None
+
+    def record_failure(self) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.ewma_error_rate += self.alpha * (1.0 - self.ewma_error_rate)
+        self._last_sample = time.monotonic()
+
+    def record_hedge_loss(self, elapsed: float) -> None:
+        # The losing call had not answered after `elapsed`, a lower bound on its
+        # latency. Without it a provider that slowed down keeps its old EWMA and
+        # stays first in line, costing every request the hedge delay
+        self.hedges_lost += 1
+        if self.ewma_latency is None or elapsed > self.ewma_latency:
+            self._update_latency(elapsed)
+        else:
+            self._last_sample = time.monotonic()
+
+    def stale(self) -> bool:
+        return self._last_sample is not None and time.monotonic() - self._last_sample >= self.reprobe_after
+
+    def claim_reprobe(self) -> None:
+        # Counts as a sample so concurrent requests do not all probe at once
+        self.reprobes += 1
+        self._last_sample = time.monotonic()
+
+    def p95(self) -> Optional[float]:
+        # Recomputed lazily; the window is small, so a sort is cheap
+        if self._p95 is None and len(self._latencies) >= 20:
+            ordered = sorted(self._latencies)
+            self._p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        return self._p95
+
+    def score(self) -> float:
+        # Unmeasured providers score 0 so they get tried and measured first;
+        # errors inflate the expected latency since a failure costs a retry.
+        # A demoted provider gets no traffic to prove it recovered, so stats
+        # older than `reprobe_after` count as unmeasured again
+        if self.stale():
+            return 0.0
+        if self.ewma_latency is None:
+            return 0.0 if self.failures == 0 else float("inf")
+        return self.ewma_latency * (1.0 + 4.0 * self.ewma_error_rate)
+
+    def stats(self) -> Dict:
+        p95 = self.p95()
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "hedges_won": self.hedges_won,
+            "hedges_lost": self.hedges_lost,
+            "reprobes": self.reprobes,
+            "ewma_latency_ms": None if self.ewma_latency is None else round(self.ewma_latency * 1000, 2),
+            "ewma_error_rate": round(self.ewma_error_rate, 4),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 2),
+        }
+
+
+class ProviderRouter:
+
+    def __init__(self, providers: List[LLMProvider], hedging_enabled: bool = True,
+                 hedge_min_delay: float = 0.1, hedge_default_delay: float = 1.5,
+                 ewma_alpha: float = 0.2, reprobe_after: float = 30.0):
+        if not providers:
+            raise ValueError("At least one LLM provider must be configured")
+
+        self.providers = providers
+        self.hedging_enabled = hedging_enabled and len(providers) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self._stats = {p.name: ProviderStats(ewma_alpha, reprobe_after=reprobe_after) for p in providers}
+        self._breakers = {
+            p.name: CircuitBreaker(
+                config.CIRCUIT_FAILURE_THRESHOLD,
+                config.CIRCUIT_RECOVERY_SECONDS,
+                config.CIRCUIT_HALF_OPEN_MAX_CALLS
+            )
+            for p in providers
+        }
+
+        self.hedges_fired = 0
+        self.failovers = 0
+
+    @property
+    def model_id(self) -> str:
+        return ",".join(f"{p.name}:{p.model}" for p in self.providers)
+
+    def _ranked(self) -> List[LLMProvider]:
+        # sorted() is stable, so ties keep the configured preference order
+        return sorted(self.providers, key=lambda p: self._stats[p.name].score())
+
+    def _next_provider(self, exclude: List[LLMProvider]) -> Optional[LLMProvider]:
+        # Breakers are consulted one at a time so a half-open trial slot is
+        # only taken by the provider that is actually called
+        for provider in self._ranked():
+            if provider not in exclude and self._breakers[provider.name].allow_request():
+                stats = self._stats[provider.name]
+                if stats.stale():
+                    stats.claim_reprobe()
+                return provider
+        return None
+
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        p95 = self._stats[provider.name].p95()
+        if p95 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    async def _attempt(self, provider: LLMProvider, system_prompt: str, prompt: str, max_tokens: int) -> Completion:
+        stats = self._stats[provider.name]
+        breaker = self._breakers[provider.name]
+        start = time.perf_counter()
+
+        try:
+            with LLM_IN_FLIGHT.track(), STAGE_LATENCY.labels("llm_call").time():
+                text, prompt_tokens, completion_tokens = await provider.complete(system_prompt, prompt, max_tokens)
+            latency = time.perf_counter() - start
+            logger.debug("%s raw response: %s", provider.name, text)
+            content = json.loads(text)
+
+        except asyncio.CancelledError:
+            # Hedge losers, deadlines and departed callers are not the provider's fault
+            PROVIDER_REQUESTS.labels(provider.name, "cancelled").inc()
+            raise
+
+        except json.JSONDecodeError:
+            # The upstream answered, so malformed output does not count against its health
+            breaker.record_success()
+            stats.record_success(time.perf_counter() - start)
+            PROVIDER_REQUESTS.labels(provider.name, "invalid_json").inc()
+            raise
+
+        except Exception as e:
+            breaker.record_failure()
+            stats.record_failure()
+            PROVIDER_REQUESTS.labels(provider.name, "error").inc()
+            logger.error("%s call failed: %s", provider.name, e)
+            raise
+
+        breaker.record_success()
+        stats.record_success(latency)
+        PROVIDER_REQUESTS.labels(provider.name, "success").inc()
+        return Completion(content, provider.name, prompt_tokens, completion_tokens, latency)
+
+    async def complete(self, system_prompt: str, prompt: str, max_tokens: int, timeout: float) -> Completion:
+        primary = self._next_provider([])
+        if primary is None:
+            raise CircuitOpenError("All provider circuit breakers are open")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        tried = [primary]
+        tasks: Dict[asyncio.Task, LLMProvider] = {
+            asyncio.create_task(self._attempt(primary, system_prompt, prompt, max_tokens)): primary
+        }
+        started = {task: loop.time() for task in tasks}
+        winner: Optional[LLMProvider] = None
+        first_error: Optional[BaseException] = None
+        hedge_at = loop.time() + self._hedge_delay(primary) if self.hedging_enabled else None
+
+        try:
+            while tasks:
+                wait_until = deadline if hedge_at is None else min(hedge_at, deadline)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=max(0.0, wait_until - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    provider = tasks.pop(task)
+                    if task.exception() is None:
+                        winner = provider
+                        if provider is not primary:
+                            self._stats[provider.name].hedges_won += 1
+                            HEDGED_REQUESTS.labels("won").inc()
+                        return task.result()
+                    if first_error is None:
+                        first_error = task.exception()
+
+                now = loop.time()
+                if now >= deadline:
+                    break
+
+                # Fire a second provider when the first is slower than its p95,
+                # or straight away when everything in flight has already failed
+                if (not tasks and len(tried) < len(self.providers)) or (hedge_at is not None and now >= hedge_at):
+                    hedge_at = None
+                    backup = self._next_provider(tried)
+                    if backup is None:
+                        continue
+                    tried.append(backup)
+                    if tasks:
+                        self.hedges_fired += 1
+                        HEDGED_REQUESTS.labels("fired").inc()
+                        logger.debug("Hedging slow %s call with %s", primary.name, backup.name)
+                    else:
+                        self.failovers += 1
+                        logger.warning("Failing over to %s", backup.name)
+                    task = asyncio.create_task(self._attempt(backup, system_prompt, prompt, max_tokens))
+                    tasks[task] = backup
+                    started[task] = loop.time()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if winner is not None:
+                for task, provider in tasks.items():
+                    self._stats[provider.name].record_hedge_loss(loop.time() - started[task])
+
+        if tasks:
+            # Still waiting when the deadline hit, which is the caller's timeout
+            for provider in tasks.values():
+                self._breakers[provider.name].record_failure()
+                self._stats[provider.name].record_failure()
+                PROVIDER_REQUESTS.labels(provider.name, "timeout").inc()
+            raise asyncio.TimeoutError()
+        raise first_error
+
+    async def warm_up(self, connections: int) -> None:
+        results = await asyncio.gather(
+            *(provider.warm_up(connections) for provider in self.providers), return_exceptions=True
+        )
+        for provider, result in zip(self.providers, results):
+            if isinstance(result, Exception):
+                # Not fatal: the first real request opens the connection instead
+                logger.warning("Warm-up of %s failed: %s", provider.name, result)
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
+
+    def stats(self) -> Dict:
+        return {
+            "hedging_enabled": self.hedging_enabled,
+            "hedges_fired": self.hedges_fired,
+            "failovers": self.failovers,
+            "providers": {
+                p.name: {
+                    "model": p.model,
+                    **self._stats[p.name].stats(),
+                    "circuit_breaker": self._breakers[p.name].stats(),
+                }
+                for p in self.providers
+            },
+        }
+
+
+def create_providers(http_client: Optional[httpx.AsyncClient] = None) -> List[LLMProvider]:
+    providers: List[LLMProvider] = []
+
+    for name in config.LLM_PROVIDERS:
+        if name == "openai":
+            if not config.OPENAI_API_KEY:
+                raise ValueError("OPENAI_API_KEY not configured")
+            providers.append(OpenAIProvider(
+                config.OPENAI_API_KEY, config.OPENAI_MODEL, http_client, config.OPENAI_BASE_URL
+            ))
+        elif name == "anthropic":
+            if not config.ANTHROPIC_API_KEY:
+                raise ValueError("ANTHROPIC_API_KEY not configured")
+            providers.append(AnthropicProvider(config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL, http_client))
+        elif name == "mock":
+            providers.append(MockProvider(
+                config.MOCK_PROVIDER_LATENCY_MS,
+                config.MOCK_PROVIDER_JITTER_MS,
+                config.MOCK_PROVIDER_ERROR_RATE,
+                config.MOCK_PROVIDER_MALFORMED_RATE
+            ))
+        else:
+            raise ValueError(f"Unknown LLM provider: {name}")
+
+    return providers
+
+
+def create_provider_router(http_client: Optional[httpx.AsyncClient] = None) -> ProviderRouter:
+    return ProviderRouter(
+        create_providers(http_client),
+        hedging_enabled=config.HEDGING_ENABLED,
+        hedge_min_delay=config.HEDGE_MIN_DELAY_MS / 1000,
+        hedge_default_delay=config.HEDGE_DEFAULT_DELAY_MS / 1000,
+        ewma_alpha=config.ROUTER_EWMA_ALPHA,
+        reprobe_after=config.ROUTER_REPROBE_SECONDS
+    )
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import config
+from app.services.shared_state import SharedStateStore
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+
+    def __init__(self, rate_per_minute: float, burst: int, max_clients: int = 10000):
+        self.rate_per_second = rate_per_minute / 60
+        self.burst = burst
+        self.max_clients = max_clients
+        # key -> [tokens, last_refill]; least recently seen clients are dropped first
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+        self.allowed = 0
+        self.limited = 0
+
+    def try_acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            elapsed = now - bucket[1]
+            bucket[0] = min(float(self.burst), bucket[0] + elapsed * self.rate_per_second)
+            bucket[1] = now
+
+        # A cost above the burst is let through from a full bucket and paid
+        # off as debt (tokens go negative), or a large batch could never pass
+        needed = min(cost, float(self.burst))
+        if bucket[0] >= needed:
+            bucket[0] -= cost
+            self.allowed += 1
+            return True, 0.0
+
+        self.limited += 1
+        if self.rate_per_second <= 0:
+            return False, 60.0
+        return False, (needed - bucket[0]) / self.rate_per_second
+
+    async def acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        return self.try_acquire(key, cost)
+
+    async def stats_async(self) -> Dict:
+        return self.stats()
+
+    def stats(self) -> Dict:
+        return {
+            "rate_per_minute": round(self.rate_per_second * 60, 2),
+            "burst": self.burst,
+            "tracked_clients": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+class SharedTokenBucketLimiter(TokenBucketLimiter):
+
+    # Buckets live in the shared store so every worker process draws from
+    # the same per-client budget instead of each granting the full rate
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, rate_per_minute: float, burst: int, store: SharedStateStore):
+        super().__init__(rate_per_minute, burst)
+        self.store = store
+
+    def try_acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        allowed, retry_after = self.store.take_tokens(key, self.rate_per_second, self.burst, cost)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+
+        if (self.allowed + self.limited) % self.PRUNE_INTERVAL == 0 and self.rate_per_second > 0:
+            self.store.prune_buckets(self.burst / self.rate_per_second)
+        return allowed, retry_after
+
+    async def acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        # SQLite may wait on another worker's write lock, so keep it off the event loop
+        return await asyncio.to_thread(self.try_acquire, key, cost)
+
+    def stats(self) -> Dict:
+        return {
+            **super().stats(),
+            "shared": True,
+            "tracked_clients": self.store.count_buckets(),
+        }
+
+    async def stats_async(self) -> Dict:
+        return await asyncio.to_thread(self.stats)
+
+
+def create_rate_limiter(store: Optional[SharedStateStore] = None) -> Optional[TokenBucketLimiter]:
+    if not config.RATE_LIMIT_ENABLED:
+        return None
+    if store is not None:
+        return SharedTokenBucketLimiter(config.RATE_LIMIT_PER_MINUTE, config.RATE_LIMIT_BURST, store)
+    return TokenBucketLimiter(config.RATE_LIMIT_PER_MINUTE, config.RATE_LIMIT_BURST)
+
+
+class ConcurrencyLimiter:
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            # A free permit is taken without suspending, so the check above cannot race
+            await self._semaphore.acquire()
+        else:
+            # Fail fast when the wait queue is already full rather than piling up
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                return False
+
+            self.waiting += 1
+            acquire = asyncio.ensure_future(self._semaphore.acquire())
+            try:
+                await asyncio.wait_for(acquire, timeout=self.queue_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                # A permit granted while wait_for was cancelling the acquire is
+                # still ours; hand it back or it is gone for good
+                if acquire.done() and not acquire.cancelled() and acquire.exception() is None:
+                    self._semaphore.release()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.rejected_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.services.lexicon import EMOTIONS
+from app.services.shared_state import SharedStateStore
+
+logger = logging.getLogger(__name__)
+
+ALL_EMOTIONS = EMOTIONS + ("neutral",)
+EMOTION_INDEX = {emotion: i for i, emotion in enumerate(ALL_EMOTIONS)}
+
+
+class CountMinSketch:
+
+    # Fixed-size frequency estimates; never under-counts, over-counts by at
+    # most ~e/width of the total with probability 1 - e^-depth
+    __slots__ = ("width", "depth", "table", "total")
+
+    def __init__(self, width: int = 256, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        # One flat array of 32-bit counters (4 KiB at the defaults) per sketch
+        self.table = array("i", bytes(4 * depth * width))
+        self.total = 0
+
+    def _cells(self, item: str) -> List[int]:
+        # crc32 rather than hash(), which differs per process, so workers
+        # sharing a session's sketch agree on its cells
+        data = item.encode("utf-8")
+        return [row * self.width + zlib.crc32(data, row) % self.width for row in range(self.depth)]
+
+    def add(self, item: str) -> int:
+        # Conservative update: only raise the cells that hold the current minimum
+        cells = self._cells(item)
+        table = self.table
+        estimate = min(table[cell] for cell in cells) + 1
+        for cell in cells:
+            if table[cell] < estimate:
+                table[cell] = estimate
+        self.total += 1
+        return estimate
+
+
+class SessionState:
+
+    __slots__ = (
+        "session_id", "first_seen", "last_seen", "last_active", "count",
+        "ewma_sentiment", "ring_sentiment", "ring_emotion", "ring_next", "ring_size",
+        "window_sum", "window_emotions", "emotion_totals", "sentiment_types",
+        "keywords", "top_keywords",
+    )
+
+    def __init__(self, session_id: str, window: int):
+        self.session_id = session_id
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+        self.last_active = time.monotonic()
+        self.count = 0
+        self.ewma_sentiment: Optional[float] = None
+
+        # Ring buffer of the last `window` results, with running sums so
+        # window statistics never need a rescan
+        self.ring_sentiment = [0.0] * window
+        self.ring_emotion = bytearray(window)
+        self.ring_next = 0
+        self.ring_size = 0
+        self.window_sum = 0.0
+        self.window_emotions = [0] * len(ALL_EMOTIONS)
+
+        self.emotion_totals = [0] * len(ALL_EMOTIONS)
+        self.sentiment_types = {"positive": 0, "negative": 0, "neutral": 0}
+        self.keywords = CountMinSketch()
+        # keyword -> estimated count for the current top-k candidates
+        self.top_keywords: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict:
+        return {
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "count": self.count,
+            "ewma_sentiment": self.ewma_sentiment,
+            "ring_sentiment": self.ring_sentiment,
+            "ring_emotion": list(self.ring_emotion),
+            "ring_next": self.ring_next,
+            "ring_size": self.ring_size,
+            "window_sum": self.window_sum,
+            "window_emotions": self.window_emotions,
+            "emotion_totals": self.emotion_totals,
+            "sentiment_types": self.sentiment_types,
+            "keywords": {"table": self.keywords.table.tolist(), "total": self.keywords.total},
+            "top_keywords": self.top_keywords,
+        }
+
+    @classmethod
+    def from_dict(cls, session_id: str, window: int, data: Dict) -> "SessionState":
+        state = cls(session_id, window)
+        # A state saved with another SESSION_WINDOW_SIZE starts over
+        if len(data["ring_sentiment"]) != window:
+            return state
+        for name in ("first_seen", "last_seen", "count", "ewma_sentiment", "ring_sentiment", "ring_next",
+                     "ring_size", "window_sum", "window_emotions", "emotion_totals", "sentiment_types",
+                     "top_keywords"):
+            setattr(state, name, data[name])
+        state.ring_emotion = bytearray(data["ring_emotion"])
+        state.keywords.table = array("i", data["keywords"]["table"])
+        state.keywords.total = data["keywords"]["total"]
+        return state
+
+
+class SessionAggregator:
+
+    def __init__(self, max_sessions: int, idle_ttl: float, window: int, alpha: float, top_k: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.window = window
+        self.alpha = alpha
+        self.top_k = top_k
+        # Least recently active first, so idle sessions are found at the front
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+
+        self.results_recorded = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    def record(self, session_id: str, result: Dict) -> None:
+        self._evict_idle()
+
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = SessionState(session_id, self.window)
+            self._sessions[session_id] = state
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_capacity += 1
+        else:
+            self._sessions.move_to_end(session_id)
+
+        self._apply(state, result)
+        self.results_recorded += 1
+
+    async def record_async(self, session_id: str, result: Dict) -> None:
+        self.record(session_id, result)
+
+    def _apply(self, state: SessionState, result: Dict) -> None:
+        sentiment = float(result.get("sentiment", 0.0))
+        emotion = EMOTION_INDEX.get(result.get("dominant_emotion"), EMOTION_INDEX["neutral"])
+
+        state.count += 1
+        state.last_seen = time.time()
+        state.last_active = time.monotonic()
+        if state.ewma_sentiment is None:
+            state.ewma_sentiment = sentiment
+        else:
+            state.ewma_sentiment += self.alpha * (sentiment - state.ewma_sentiment)
+
+        slot = state.ring_next
+        if state.ring_size == self.window:
+            state.window_sum -= state.ring_sentiment[slot]
+            state.window_emotions[state.ring_emotion[slot]] -= 1
+        else:
+            state.ring_size += 1
+        state.ring_sentiment[slot] = sentiment
+        state.ring_emotion[slot] = emotion
+        state.ring_next = (slot + 1) % self.window
+        state.window_sum += sentiment
+        state.window_emotions[emotion] += 1
+
+        state.emotion_totals[emotion] += 1
+        sentiment_type = result.get("sentiment_type")
+        if sentiment_type in state.sentiment_types:
+            state.sentiment_types[sentiment_type] += 1
+
+        for keyword in result.get("keywords", []):
+            self._add_keyword(state, str(keyword).lower())
+
+    def _add_keyword(self, state: SessionState, keyword: str) -> None:
+        estimate = state.keywords.add(keyword)
+        top = state.top_keywords
+
+        if keyword in top or len(top) < self.top_k:
+            top[keyword] = estimate
+            return
+
+        # top_k is small, so a linear scan for the minimum beats keeping a heap in sync
+        weakest = min(top, key=top.get)
+        if estimate > top[weakest]:
+            del top[weakest]
+            top[keyword] = estimate
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            state = next(iter(self._sessions.values()))
+            if state.last_active >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted_idle += 1
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        self._evict_idle()
+        state = self._sessions.get(session_id)
+        if state is None:
+            return None
+        return self._summary(state)
+
+    async def get_async(self, session_id: str) -> Optional[Dict]:
+        return self.get(session_id)
+
+    def _summary(self, state: SessionState) -> Dict:
+        session_id = state.session_id
+        window_total = state.ring_size or 1
+        return {
+            "session_id": session_id,
+            "count": state.count,
+            "first_seen": datetime.fromtimestamp(state.first_seen).isoformat(),
+            "last_seen": datetime.fromtimestamp(state.last_seen).isoformat(),
+            # None until a result is recorded, e.g. in a state reset by from_dict
+            "ewma_sentiment": round(state.ewma_sentiment, 4) if state.ewma_sentiment is not None else None,
+            "window": {
+                "size": state.ring_size,
+                "mean_sentiment": round(state.window_sum / window_total, 4),
+                "emotion_distribution": {
+                    emotion: round(state.window_emotions[i] / window_total, 4)
+                    for i, emotion in enumerate(ALL_EMOTIONS)
+                },
+            },
+            "emotion_totals": {
+                emotion: state.emotion_totals[i] for i, emotion in enumerate(ALL_EMOTIONS)
+            },
+            "sentiment_types": dict(state.sentiment_types),
+            "top_keywords": [
+                {"keyword": keyword, "count": count}
+                for keyword, count in sorted(state.top_keywords.items(), key=lambda item: -item[1])
+            ],
+        }
+
+    async def stats_async(self) -> Dict:
+        return self.stats()
+
+    def stats(self) -> Dict:
+        return {
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "results_recorded": self.results_recorded,
+            "evicted_idle": self.evicted_idle,
+            "evicted_capacity": self.evicted_capacity,
+        }
+
+
+class SharedSessionAggregator(SessionAggregator):
+
+    # Sessions live in the shared store so every worker adds to, and answers
+    # GET /sessions/{id} from, the same aggregate; a worker-local one would
+    # return a partial view or 404 depending on which worker is asked
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, max_sessions: int, idle_ttl: float, window: int, alpha: float, top_k: int,
+                 store: SharedStateStore):
+        super().__init__(max_sessions, idle_ttl, window, alpha, top_k)
+        self.store = store
+
+    def record(self, session_id: str, result: Dict) -> None:
+        def update(data: Optional[Dict]) -> Dict:
+            if data is None:
+                state = SessionState(session_id, self.window)
+            else:
+                state = SessionState.from_dict(session_id, self.window, data)
+            self._apply(state, result)
+            return state.to_dict()
+
+        self.store.update_session(session_id, update, time.time() - self.idle_ttl)
+        self.results_recorded += 1
+        if self.results_recorded % self.PRUNE_INTERVAL == 0:
+            self.store.prune_sessions(time.time() - self.idle_ttl, self.max_sessions)
+
+    async def record_async(self, session_id: str, result: Dict) -> None:
+        # SQLite may wait on another worker's write lock, so keep it off the event loop
+        await asyncio.to_thread(self.record, session_id, result)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        data = self.store.load_session(session_id, time.time() - self.idle_ttl)
+        if data is None:
+            return None
+        return self._summary(SessionState.from_dict(session_id, self.window, data))
+
+    async def get_async(self, session_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    def stats(self) -> Dict:
+        return {
+            **super().stats(),
+            "shared": True,
+            "active_sessions": self.store.count_sessions(),
+        }
+
+    async def stats_async(self) -> Dict:
+        # Counting rows queries SQLite, so it stays off the event loop like the other store calls
+        return await asyncio.to_thread(self.stats)
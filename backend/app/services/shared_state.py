@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.metrics import MetricsRegistry, registry
+
+logger = logging.getLogger(__name__)
+
+
+class SharedStateStore:
+
+    # One SQLite file shared by all workers on the host. Each worker opens its
+    # own connection; WAL lets readers proceed while one writer holds the lock
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS worker_metrics ("
+            "worker TEXT PRIMARY KEY, updated_at REAL NOT NULL, snapshot TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_aggregates ("
+            "session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, state TEXT NOT NULL)"
+        )
+        # The connection is used from to_thread workers, so calls are serialized here
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM worker_metrics")
+            self._conn.execute("DELETE FROM rate_limit_buckets")
+            self._conn.execute("DELETE FROM session_aggregates")
+
+    def publish_metrics(self, worker: str, snapshot: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO worker_metrics (worker, updated_at, snapshot) VALUES (?, ?, ?)",
+                (worker, time.time(), json.dumps(snapshot))
+            )
+
+    def load_metrics(self) -> List[Tuple[str, float, Dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT worker, updated_at, snapshot FROM worker_metrics").fetchall()
+        return [(worker, updated_at, json.loads(snapshot)) for worker, updated_at, snapshot in rows]
+
+    def take_tokens(self, key: str, rate_per_second: float, burst: float, cost: float) -> Tuple[bool, float]:
+        # BEGIN IMMEDIATE takes the write lock up front, so the read-modify-write
+        # of a bucket is atomic across processes
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = float(burst) if row is None else min(
+                    float(burst), row[0] + max(0.0, now - row[1]) * rate_per_second
+                )
+                # A cost above the burst is let through from a full bucket and
+                # paid off as debt, or a large batch could never be admitted
+                needed = min(cost, float(burst))
+                allowed = tokens >= needed
+                if allowed:
+                    tokens -= cost
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if allowed:
+            return True, 0.0
+        if rate_per_second <= 0:
+            return False, 60.0
+        return False, (needed - tokens) / rate_per_second
+
+    def prune_buckets(self, idle_seconds: float) -> None:
+        # A bucket idle this long has refilled completely, which is the same as no row
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (time.time() - idle_seconds,))
+
+    def count_buckets(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+
+    def update_session(self, session_id: str, update: Callable[[Optional[Dict]], Dict],
+                       idle_before: float) -> None:
+        # Read-modify-write under the write lock, like take_tokens, so results
+        # recorded by two workers at once are both kept
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state, updated_at FROM session_aggregates WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                # A session idle past the TTL starts over, as it would after eviction
+                data = json.loads(row[0]) if row is not None and row[1] >= idle_before else None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO session_aggregates (session_id, updated_at, state) VALUES (?, ?, ?)",
+                    (session_id, time.time(), json.dumps(update(data)))
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load_session(self, session_id: str, idle_before: float) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM session_aggregates WHERE session_id = ? AND updated_at >= ?",
+                (session_id, idle_before)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def prune_sessions(self, idle_before: float, max_sessions: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM session_aggregates WHERE updated_at < ?", (idle_before,))
+            self._conn.execute(
+                "DELETE FROM session_aggregates WHERE session_id IN ("
+                "SELECT session_id FROM session_aggregates ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (max_sessions,)
+            )
+
+    def count_sessions(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM session_aggregates").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SharedMetrics:
+
+    def __init__(self, store: SharedStateStore, interval: float, local: MetricsRegistry = registry):
+        self.store = store
+        self.interval = interval
+        self.local = local
+        self.worker = str(os.getpid())
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await self.publish()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.publish()
+            except Exception as e:
+                logger.warning("Publishing worker metrics failed: %s", e)
+
+    async def publish(self) -> None:
+        await asyncio.to_thread(self.store.publish_metrics, self.worker, self.local.snapshot())
+
+    async def aggregate(self) -> MetricsRegistry:
+        rows = await asyncio.to_thread(self.store.load_metrics)
+        stale_before = time.time() - 3 * self.interval
+
+        # This worker contributes live values rather than its last published row
+        snapshots = [self.local.snapshot()]
+        for worker, updated_at, snapshot in rows:
+            if worker == self.worker:
+                continue
+            if updated_at < stale_before:
+                # Counters of a stopped worker still count; its gauges no longer do
+                snapshot = {name: data for name, data in snapshot.items() if data["type"] != "gauge"}
+            snapshots.append(snapshot)
+
+        return self.local.merged(snapshots)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.publish()
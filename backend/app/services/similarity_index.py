@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services import lexicon, local_scorer
+from app.services.metrics import SIMILARITY_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+ALL_EMOTIONS = lexicon.EMOTIONS + ("neutral",)
+SENTIMENT_TYPES = ("positive", "negative", "neutral")
+KEYWORD_SEP = "\x1f"
+KEYWORDS_WIDTH = 160
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Past this many rows the scan (about 0.1 ms per 1000 rows at 256 dims) runs
+# in a thread, where numpy releases the GIL, instead of on the event loop
+OFFLOAD_ROWS = 4096
+
+META_DTYPE = np.dtype([
+    ("valid", np.bool_),
+    ("sentiment", np.float32),
+    ("emotion", np.uint8),
+    ("sentiment_type", np.uint8),
+    ("signature", np.uint32),
+    ("keywords", f"U{KEYWORDS_WIDTH}"),
+    ("last_used", np.float64),
+])
+
+
+def embed(text: str, dim: int) -> np.ndarray:
+    # Signed feature hashing of character trigrams plus word unigrams and
+    # bigrams, L2-normalized so a dot product is the cosine similarity.
+    # crc32 rather than hash() keeps vectors stable across processes and
+    # restarts, which a file-backed index needs
+    normalized = " ".join(text.lower().split())
+    words = WORD_RE.findall(normalized)
+    padded = f" {normalized} ".encode("utf-8")
+
+    features: List[bytes] = [padded[i:i + 3] for i in range(len(padded) - 2)]
+    features.extend(b"w:" + word.encode("utf-8") for word in words)
+    features.extend(b"b:" + f"{a} {b}".encode("utf-8") for a, b in zip(words, words[1:]))
+
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(feature) for feature in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, (hashes % dim).astype(np.intp), signs)
+
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def polarity_signature(text: str) -> int:
+    # Checksum of the words that decide sentiment (lexicon cues, negations,
+    # contrast words, sarcasm). N-gram similarity alone rates "happy" and
+    # "unhappy", or "good" and "not good", as near-duplicates; requiring the
+    # same signature keeps those from ever matching
+    text_lower = text.lower()
+    cues = set()
+    for token in local_scorer.TOKEN_RE.findall(text_lower):
+        if (token in lexicon.TOKEN_TABLE or token in local_scorer.EXTRA_WORDS or token in local_scorer.EMOJI
+                or token in local_scorer.NEGATIONS or token in local_scorer.CONTRAST_WORDS
+                or token.endswith("n't")):
+            cues.add(token)
+    if local_scorer.SARCASM_RE.search(text_lower):
+        cues.add("<sarcasm>")
+    return zlib.crc32(KEYWORD_SEP.join(sorted(cues)).encode("utf-8"))
+
+
+class Probe(NamedTuple):
+    vector: np.ndarray
+    signature: int
+
+
+class SimilarityIndex:
+
+    # Unit vectors of LLM-scored texts in one contiguous (capacity, dim)
+    # matrix, so a lookup is a single matrix-vector product. Rows are
+    # recycled least-recently-used once the index is full
+    def __init__(self, dim: int, capacity: int, threshold: float, min_chars: int,
+                 namespace: str, path: Optional[str] = None):
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # While a scan runs in a thread, rows it reads must not change under
+        # it; adds made meanwhile wait here until the last scan finishes
+        self._scans = 0
+        self._pending: List[Tuple[Probe, Dict]] = []
+
+        if path:
+            self.vectors, self.meta = self._open_files(path, namespace)
+        else:
+            self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+            self.meta = np.zeros(capacity, dtype=META_DTYPE)
+
+        valid = np.flatnonzero(self.meta["valid"])
+        # Rows below `size` have been written at least once; the rest are never scanned
+        self.size = int(valid[-1]) + 1 if len(valid) else 0
+        self.entries = len(valid)
+
+    def _open_files(self, path: str, namespace: str):
+        os.makedirs(path, exist_ok=True)
+        vectors_path = os.path.join(path, "vectors.npy")
+        meta_path = os.path.join(path, "meta.npy")
+        info_path = os.path.join(path, "index.json")
+        info = {"dim": self.dim, "capacity": self.capacity, "namespace": namespace}
+
+        existing = None
+        if os.path.exists(info_path):
+            with open(info_path) as f:
+                existing = json.load(f)
+
+        # A different model, prompt or geometry invalidates every stored result
+        if existing == info and os.path.exists(vectors_path) and os.path.exists(meta_path):
+            vectors = np.lib.format.open_memmap(vectors_path, mode="r+")
+            meta = np.lib.format.open_memmap(meta_path, mode="r+")
+            logger.info("Loaded similarity index from %s (%s entries)", path, int(meta['valid'].sum()))
+            return vectors, meta
+
+        if existing is not None:
+            logger.info("Similarity index at %s was built for %s, starting a new one", path, existing)
+        vectors = np.lib.format.open_memmap(
+            vectors_path, mode="w+", dtype=np.float32, shape=(self.capacity, self.dim)
+        )
+        meta = np.lib.format.open_memmap(meta_path, mode="w+", dtype=META_DTYPE, shape=(self.capacity,))
+        with open(info_path, "w") as f:
+            json.dump(info, f)
+        return vectors, meta
+
+    def probe(self, text: str) -> Optional[Probe]:
+        # Short texts share too many n-grams with unrelated ones to match on
+        if len(text) < self.min_chars:
+            return None
+        return Probe(embed(text, self.dim), polarity_signature(text))
+
+    async def search(self, probe: Probe) -> Optional[Dict]:
+        if self.size == 0:
+            return self._miss()
+
+        rows = self.vectors[:self.size]
+        if self.size < OFFLOAD_ROWS:
+            return self._best_match(rows @ probe.vector, probe)
+
+        self._scans += 1
+        try:
+            similarities = await asyncio.to_thread(np.dot, rows, probe.vector)
+            return self._best_match(similarities, probe)
+        finally:
+            self._scans -= 1
+            if self._scans == 0:
+                pending, self._pending = self._pending, []
+                for pending_probe, result in pending:
+                    self._write(pending_probe, result)
+
+    def _best_match(self, similarities: np.ndarray, probe: Probe) -> Optional[Dict]:
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        if len(candidates) == 0:
+            return self._miss()
+        candidates = candidates[self.meta["signature"][candidates] == probe.signature]
+        if len(candidates) == 0:
+            return self._miss()
+        best = int(candidates[np.argmax(similarities[candidates])])
+
+        self.hits += 1
+        SIMILARITY_LOOKUPS.labels("hit").inc()
+        row = self.meta[best]
+        self.meta["last_used"][best] = time.time()
+        keywords = str(row["keywords"])
+        return {
+            "sentiment": round(float(row["sentiment"]), 3),
+            "dominant_emotion": ALL_EMOTIONS[row["emotion"]],
+            "sentiment_type": SENTIMENT_TYPES[row["sentiment_type"]],
+            "keywords": keywords.split(KEYWORD_SEP) if keywords else [],
+        }
+
+    def _miss(self) -> None:
+        self.misses += 1
+        SIMILARITY_LOOKUPS.labels("miss").inc()
+        return None
+
+    def add(self, probe: Probe, result: Dict) -> None:
+        if self._scans:
+            self._pending.append((probe, result))
+            return
+        self._write(probe, result)
+
+    def _write(self, probe: Probe, result: Dict) -> None:
+        emotion = result.get("dominant_emotion")
+        sentiment_type = result.get("sentiment_type")
+        if emotion not in ALL_EMOTIONS or sentiment_type not in SENTIMENT_TYPES:
+            return
+
+        if self.size < self.capacity:
+            slot = self.size
+            self.size += 1
+            self.entries += 1
+        else:
+            slot = int(np.argmin(self.meta["last_used"]))
+            self.evictions += 1
+
+        # Keywords that do not fit the fixed-width column are dropped whole
+        keywords = ""
+        for keyword in result.get("keywords", []):
+            candidate = f"{keywords}{KEYWORD_SEP}{keyword}" if keywords else str(keyword)
+            if len(candidate) > KEYWORDS_WIDTH:
+                break
+            keywords = candidate
+
+        self.vectors[slot] = probe.vector
+        self.meta[slot] = (
+            True,
+            float(result.get("sentiment", 0.0)),
+            ALL_EMOTIONS.index(emotion),
+            SENTIMENT_TYPES.index(sentiment_type),
+            probe.signature,
+            keywords,
+            time.time(),
+        )
+
+    def warm_up(self) -> None:
+        # Reading every used row faults the memory-mapped pages in now rather
+        # than during the first lookups
+        if self.size:
+            float(self.vectors[:self.size].sum())
+            int(self.meta["signature"][:self.size].sum())
+
+    def close(self) -> None:
+        pending, self._pending = self._pending, []
+        for probe, result in pending:
+            self._write(probe, result)
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+            self.meta.flush()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "path": self.path,
+            "entries": self.entries,
+            "capacity": self.capacity,
+            "dim": self.dim,
+            "threshold": self.threshold,
+            "memory_bytes": self.vectors.nbytes + self.meta.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
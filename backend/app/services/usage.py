@@ -0,0 +1,41 @@
+import time
+from typing import Dict
+
+from app.config import config
+
+
+class TokenUsageTracker:
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_seconds = 0.0
+
+    def record(self, prompt_tokens: int, completion_tokens: int, latency_seconds: float) -> None:
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.latency_seconds += latency_seconds
+
+    def stats(self) -> Dict:
+        elapsed_minutes = max((time.monotonic() - self.started) / 60, 1 / 60)
+        requests = max(self.requests, 1)
+        estimated_cost = (
+            self.prompt_tokens / 1000 * config.OPENAI_PROMPT_COST_PER_1K
+            + self.completion_tokens / 1000 * config.OPENAI_COMPLETION_COST_PER_1K
+        )
+
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / requests, 1),
+            "avg_completion_tokens": round(self.completion_tokens / requests, 1),
+            "avg_latency_ms": round(self.latency_seconds / requests * 1000, 1),
+            "tokens_per_minute": round((self.prompt_tokens + self.completion_tokens) / elapsed_minutes, 1),
+            "requests_per_minute": round(self.requests / elapsed_minutes, 2),
+            "estimated_cost_usd": round(estimated_cost, 6)
+        }
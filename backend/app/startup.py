@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class StartupTimings:
+
+    # Imported before anything heavy so the clock starts with the app itself
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.ready = False
+        self.ready_after: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        if self.ready_after is None:
+            self.ready_after = time.perf_counter() - self.started
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "time_to_ready_ms": round(self.ready_after * 1000, 1) if self.ready_after is not None else None,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            "warmup_error": self.warmup_error,
+        }
+
+
+startup_timings = StartupTimings()
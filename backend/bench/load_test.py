@@ -0,0 +1,144 @@
+"""Drive a running backend at fixed concurrency levels and report latencies.
+
+    cd backend && python -m bench.load_test --url http://127.0.0.1:8000 \
+        --scenarios process_text,batch_process,batch_stream --concurrency 1,8,32
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+from bench.stats import summarize
+
+SAMPLE_TEXTS = [
+    "I just got promoted and I'm so happy",
+    "This is the worst day of my life",
+    "Not sure how I feel about the new schedule",
+    "Oh great, another meeting that could have been an email",
+    "I'm worried about the exam tomorrow",
+    "That was a wonderful surprise, thank you",
+    "The food was disgusting and the service was slow",
+    "I can't believe they cancelled the show, I'm furious",
+]
+
+SCENARIOS = ("process_text", "batch_process", "batch_process_packed", "batch_stream")
+
+
+class TextSource:
+
+    # distinct=0 makes every text unique (no cache or single-flight hits);
+    # a small number of distinct texts measures the cached path instead
+    def __init__(self, distinct: int = 0):
+        self.distinct = distinct
+        self._next = 0
+        # Unique runs get a fresh tag so earlier scenarios or runs cannot warm the cache
+        self.tag = uuid.uuid4().hex[:8] if distinct == 0 else "d"
+
+    def take(self, n: int = 1) -> List[str]:
+        texts = []
+        for _ in range(n):
+            i = self._next
+            self._next += 1
+            if self.distinct:
+                i %= self.distinct
+            texts.append(f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} #{self.tag}-{i}")
+        return texts
+
+
+async def _call(client: httpx.AsyncClient, scenario: str, texts: List[str]) -> int:
+    if scenario == "process_text":
+        response = await client.post("/process_text", json={"text": texts[0]})
+        return response.status_code
+
+    if scenario in ("batch_process", "batch_process_packed"):
+        params = {"pack": "true"} if scenario == "batch_process_packed" else None
+        response = await client.post("/batch_process", json=texts, params=params)
+        return response.status_code
+
+    body = "".join(json.dumps({"text": text}) + "\n" for text in texts)
+    async with client.stream(
+        "POST", "/batch_process/stream",
+        content=body, headers={"content-type": "application/x-ndjson"}
+    ) as response:
+        async for _ in response.aiter_lines():
+            pass
+    return response.status_code
+
+
+async def run_scenario(url: str, scenario: str, concurrency: int, requests: int,
+                       batch_size: int = 10, distinct: int = 0, timeout: float = 60) -> Dict:
+    source = TextSource(distinct)
+    per_call = 1 if scenario == "process_text" else batch_size
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+
+        async def worker() -> None:
+            for _ in counter:
+                texts = source.take(per_call)
+                start = time.perf_counter()
+                try:
+                    status = await _call(client, scenario, texts)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[str(status)] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    summary = summarize(latencies, elapsed)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "texts_per_request": per_call,
+        **summary,
+        "texts_per_second": round(summary["throughput_rps"] * per_call, 1),
+        "status_codes": dict(statuses),
+        "error_rate": round(1 - statuses.get("200", 0) / max(1, len(latencies)), 4),
+    }
+
+
+async def run(url: str, scenarios: List[str], levels: List[int], requests: int,
+              batch_size: int, distinct: int) -> List[Dict]:
+    results = []
+    for scenario in scenarios:
+        for concurrency in levels:
+            results.append(await run_scenario(url, scenario, concurrency, requests, batch_size, distinct))
+    return results
+
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--scenarios", type=_csv, default=list(SCENARIOS),
+                        help=f"comma-separated, any of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in _csv(v)], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--batch-size", type=int, default=10, help="texts per batch/stream request")
+    parser.add_argument("--distinct", type=int, default=0, help="distinct texts to cycle through (0 = all unique)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(run(args.url, args.scenarios, args.concurrency, args.requests, args.batch_size, args.distinct))
+    print(json.dumps({"benchmark": "load_test", "url": args.url, "results": results}, indent=2))
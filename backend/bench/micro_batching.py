@@ -0,0 +1,101 @@
+"""Compare /process_text-style analysis with and without micro-batching.
+
+Runs LLMService against an in-process mock upstream that, like a real
+provider, has a fixed per-call overhead, a small per-item cost and a cap on
+concurrent calls. Prints one JSON document with throughput and latency
+percentiles for each mode.
+
+    cd backend && python -m bench.micro_batching --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Tuple
+
+from app.config import config
+from app.services.llm_service import LLMService
+from app.services.providers import MockProvider, ProviderRouter
+from bench.stats import summarize
+
+SAMPLE_TEXTS = [
+    "I just got promoted and I'm so happy",
+    "This is the worst day of my life",
+    "Not sure how I feel about the new schedule",
+    "Oh great, another meeting that could have been an email",
+    "I'm worried about the exam tomorrow",
+    "That was a wonderful surprise, thank you",
+]
+
+
+class LimitedMockProvider(MockProvider):
+
+    def __init__(self, call_ms: float, item_ms: float, max_concurrent: int):
+        super().__init__(latency_ms=0)
+        self.call_latency = call_ms / 1000
+        self.item_latency = item_ms / 1000
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def complete(self, system_prompt: str, prompt: str, max_tokens: int) -> Tuple[str, int, int]:
+        async with self._slots:
+            self.calls += 1
+            items = max(1, prompt.count("\n") - 1)
+            await asyncio.sleep(self.call_latency + self.item_latency * items)
+            content, prompt_tokens, completion_tokens = await super().complete(system_prompt, prompt, max_tokens)
+            self.prompt_tokens += prompt_tokens
+            return content, prompt_tokens, completion_tokens
+
+
+async def run_mode(batching: bool, args: argparse.Namespace) -> Dict:
+    config.MICRO_BATCH_ENABLED = batching
+    config.MICRO_BATCH_WINDOW_MS = args.window_ms
+    config.MICRO_BATCH_MAX_ITEMS = args.max_items
+    config.ANALYSIS_MODE = "llm"
+
+    provider = LimitedMockProvider(args.call_ms, args.item_ms, args.upstream_concurrency)
+    service = LLMService(router=ProviderRouter([provider], hedging_enabled=False))
+    latencies: List[float] = []
+    counter = iter(range(args.requests))
+
+    async def client() -> None:
+        for i in counter:
+            # Unique texts so single-flight cannot coalesce them
+            text = f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} #{i}"
+            start = time.perf_counter()
+            await service.analyze_text(text)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    await service.close()
+
+    return {
+        "micro_batching": batching,
+        **summarize(latencies, elapsed),
+        "upstream_calls": provider.calls,
+        "upstream_prompt_tokens": provider.prompt_tokens,
+        "batcher": service.micro_batch_stats(),
+    }
+
+
+async def main(args: argparse.Namespace) -> Dict:
+    return {
+        "benchmark": "micro_batching",
+        "params": vars(args),
+        "results": [await run_mode(False, args), await run_mode(True, args)],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--window-ms", type=float, default=20)
+    parser.add_argument("--max-items", type=int, default=16)
+    parser.add_argument("--call-ms", type=float, default=300, help="fixed upstream latency per call")
+    parser.add_argument("--item-ms", type=float, default=15, help="extra upstream latency per packed item")
+    parser.add_argument("--upstream-concurrency", type=int, default=16, help="concurrent calls the upstream allows")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,73 @@
+"""Microbenchmarks for the per-request hot paths of LLMService.
+
+    cd backend && python -m bench.microbench --number 20000
+"""
+import argparse
+import json
+import logging
+import timeit
+from typing import Callable, Dict
+
+from app.services.llm_service import LLMService
+from app.services.providers import MockProvider, ProviderRouter
+
+SHORT_TEXT = "I just got promoted and I'm so happy!"
+LONG_TEXT = (
+    "Honestly I thought the trip would be a disaster after the flight got delayed, "
+    "but the hotel upgraded us, the food was amazing and I can't stop smiling. "
+) * 8
+
+VALID_RESPONSE = {
+    "sentiment": 0.85,
+    "sentiment_type": "positive",
+    "keywords": ["promoted", "happy", "great", "news", "excited", "extra"],
+    "dominant_emotion": "joy",
+}
+MESSY_RESPONSE = {
+    "sentiment": "1.7",
+    "sentiment_type": "very positive",
+    "keywords": ["", " happy ", None, "promoted"],
+    "dominant_emotion": "Elation",
+}
+
+
+def _time(fn: Callable[[], object], number: int, repeat: int) -> Dict:
+    # Best of `repeat` runs, the usual way to discount scheduler noise
+    runs = timeit.repeat(fn, number=number, repeat=repeat)
+    best = min(runs) / number
+    return {
+        "ns_per_op": round(best * 1e9, 1),
+        "ops_per_second": round(1 / best),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(number: int, repeat: int) -> Dict:
+    service = LLMService(router=ProviderRouter([MockProvider()]))
+
+    # The fallback logs every call at INFO; silence it so logging is not what gets measured
+    logging.disable(logging.CRITICAL)
+    try:
+        return {
+            "_create_prompt[short]": _time(lambda: service._create_prompt(SHORT_TEXT), number, repeat),
+            "_create_prompt[long]": _time(lambda: service._create_prompt(LONG_TEXT), number, repeat),
+            "_validate_response[valid]": _time(lambda: service._validate_response(VALID_RESPONSE), number, repeat),
+            "_validate_response[messy]": _time(lambda: service._validate_response(MESSY_RESPONSE), number, repeat),
+            "_generate_fallback_response[short]": _time(
+                lambda: service._generate_fallback_response(SHORT_TEXT), number, repeat
+            ),
+            "_generate_fallback_response[long]": _time(
+                lambda: service._generate_fallback_response(LONG_TEXT), number // 10 or 1, repeat
+            ),
+        }
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps({"benchmark": "microbench", "results": run(args.number, args.repeat)}, indent=2))
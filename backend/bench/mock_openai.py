@@ -0,0 +1,90 @@
+"""OpenAI-compatible mock upstream with configurable latency and failures.
+
+Answers POST /v1/chat/completions with the local scorer, so results look
+plausible without an API key. Point the backend at it with
+OPENAI_BASE_URL=http://127.0.0.1:9100/v1.
+
+    cd backend && python -m bench.mock_openai --latency-ms 300 --error-rate 0.02
+"""
+import argparse
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.services.providers import MockProvider, MockProviderError
+
+
+def create_app(latency_ms: float = 200, jitter_ms: float = 50,
+               error_rate: float = 0.0, malformed_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI")
+    provider = MockProvider(latency_ms, jitter_ms, error_rate, malformed_rate)
+    counts = {"requests": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(req: Request):
+        body = await req.json()
+        messages = body.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        prompt = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        counts["requests"] += 1
+
+        try:
+            content, prompt_tokens, completion_tokens = await provider.complete(
+                system_prompt, prompt, body.get("max_tokens", 200)
+            )
+        except MockProviderError as e:
+            counts["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": str(e), "type": "server_error", "code": None}}
+            )
+
+        counts["prompt_tokens"] += prompt_tokens
+        counts["completion_tokens"] += completion_tokens
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/v1/models")
+    async def models():
+        # The backend's warm-up lists models to open pooled connections
+        return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return counts
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.malformed_rate),
+        host=args.host, port=args.port, log_level="warning"
+    )
@@ -0,0 +1,80 @@
+"""Requests/sec of POST /process_text on the fallback path, in process.
+
+The upstream is forced down (open circuit breaker) and the cache disabled,
+so every request runs admission, analysis via the keyword fallback,
+response validation and JSON encoding, with no network in between.
+
+    cd backend && python -m bench.response_path --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+
+import httpx
+
+os.environ.update({
+    "OPENAI_API_KEY": "sk-bench",
+    "LLM_PROVIDERS": "openai",
+    "RATE_LIMIT_ENABLED": "false",
+    "CACHE_ENABLED": "false",
+    "PREPROCESS_ENABLED": "false",
+    # There is no upstream to open connections to; the SDK import still happens
+    "WARMUP_CONNECTIONS": "0",
+    "LOG_LEVEL": "WARNING",
+})
+
+from app.main import app  # noqa: E402
+from bench.stats import summarize  # noqa: E402
+
+TEXTS = [
+    "I just got promoted and I'm so happy",
+    "This is the worst day of my life",
+    "Oh great, another meeting that could have been an email",
+    "I'm worried about the exam tomorrow but excited for the trip",
+]
+
+
+async def run(requests: int, concurrency: int) -> Dict:
+    logging.disable(logging.WARNING)
+    latencies: List[float] = []
+    counter = iter(range(requests))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Measure only after warm-up, as a load balancer would send traffic
+            while (await client.get("/ready")).status_code != 200:
+                await asyncio.sleep(0.05)
+
+            service = app.state.llm_service
+            for breaker in service.router._breakers.values():
+                breaker.failure_threshold = 1
+                breaker.recovery_timeout = 3600
+                breaker.record_failure()
+
+            async def worker() -> None:
+                for i in counter:
+                    text = f"{TEXTS[i % len(TEXTS)]} #{i}"
+                    start = time.perf_counter()
+                    response = await client.post("/process_text", json={"text": text})
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"Unexpected status {response.status_code}: {response.text}")
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+    return {"benchmark": "response_path", "concurrency": concurrency, **summarize(latencies, elapsed)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency)), indent=2))
@@ -0,0 +1,133 @@
+"""Reproducible end-to-end benchmark: mock upstream + backend + load + microbenchmarks.
+
+Starts bench.mock_openai and the backend (uvicorn) as subprocesses on local
+ports, runs the load generator and microbenchmarks, and writes one JSON
+report tagged with the current git commit so runs can be diffed.
+
+    cd backend && python -m bench.run --output bench-results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench import load_test, microbench
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_until_up(url: str, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            # /ready answers 503 until warm-up has finished
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def main(args: argparse.Namespace) -> Dict:
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    backend_url = f"http://127.0.0.1:{args.port}"
+
+    env = dict(os.environ)
+    # Benchmarks measure the service, not the per-client rate limit
+    env.update({
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{mock_url}/v1",
+        "LLM_PROVIDERS": "openai",
+        "RATE_LIMIT_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    for assignment in args.env:
+        key, _, value = assignment.partition("=")
+        env[key] = value
+
+    processes = [
+        _start([
+            "-m", "bench.mock_openai", "--port", str(args.mock_port),
+            "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate), "--malformed-rate", str(args.malformed_rate),
+        ], env),
+        _start([
+            "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+            "--log-level", "warning",
+        ], env),
+    ]
+    try:
+        _wait_until_up(f"{mock_url}/stats")
+        _wait_until_up(f"{backend_url}/ready")
+
+        load = asyncio.run(load_test.run(
+            backend_url, args.scenarios, args.concurrency, args.requests, args.batch_size, args.distinct
+        ))
+        upstream = httpx.get(f"{mock_url}/stats").json()
+        server_metrics = httpx.get(f"{backend_url}/metrics/json").json()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "load_test": load,
+        "upstream": upstream,
+        "server_stages": server_metrics.get("stages", {}),
+        "microbench": {} if args.skip_microbench else microbench.run(args.micro_number, 5),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200, help="mock upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra backend setting, e.g. --env MICRO_BATCH_ENABLED=true")
+    parser.add_argument("--micro-number", type=int, default=20000)
+    parser.add_argument("--skip-microbench", action="store_true")
+    load_test.add_arguments(parser)
+    args = parser.parse_args()
+
+    report = json.dumps(main(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
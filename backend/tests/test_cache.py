@@ -0,0 +1,179 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import config
+from app.services import cache, llm_service
+from app.services.cache import LRUCache, ResultCache, SQLiteCacheBackend, create_result_cache, make_cache_key
+from app.services.llm_service import LLMService
+from app.services.providers import MockProvider, ProviderRouter
+
+RESULT = {"sentiment": 0.6, "sentiment_type": "positive", "keywords": ["happy"], "dominant_emotion": "joy"}
+
+
+class FakeClock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=clock, time=clock))
+    return clock
+
+
+class FailingBackend:
+
+    name = "failing"
+
+    async def get(self, key):
+        raise ConnectionError("backend down")
+
+    async def set(self, key, value, ttl_seconds):
+        raise ConnectionError("backend down")
+
+
+def test_cache_key_ignores_case_and_whitespace_but_not_the_prompt_version():
+    key = make_cache_key("I am  so happy\n", "gpt", "v2")
+
+    assert make_cache_key("i am so HAPPY", "gpt", "v2") == key
+    assert make_cache_key("I am so happy", "gpt", "v3") != key
+    assert make_cache_key("I am so happy", "claude", "v2") != key
+
+
+def test_lru_entries_expire_after_their_ttl(clock):
+    lru = LRUCache(max_entries=10, ttl_seconds=60)
+    lru.set("a", RESULT)
+    lru.set("b", RESULT, ttl_seconds=5)
+
+    clock.now += 5.1
+    assert lru.get("b") is None
+    assert lru.get("a") == RESULT
+    clock.now += 55
+    assert lru.get("a") is None
+    assert lru.expirations == 2 and len(lru) == 0
+
+
+def test_lru_evicts_the_least_recently_used_entry(clock):
+    lru = LRUCache(max_entries=2, ttl_seconds=60)
+    lru.set("a", RESULT)
+    lru.set("b", RESULT)
+    lru.get("a")
+    lru.set("c", RESULT)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == RESULT and lru.get("c") == RESULT
+    assert lru.evictions == 1
+
+
+def test_sqlite_backend_is_shared_and_honours_expiry(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def run():
+        writer = ResultCache(10, 60, SQLiteCacheBackend(path))
+        await writer.set("a", RESULT)
+
+        # A second process starts with an empty memory tier and reads through
+        reader = ResultCache(10, 60, SQLiteCacheBackend(path))
+        assert await reader.get("a") == RESULT
+        assert reader.backend_hits == 1
+        assert len(reader.memory) == 1
+
+        clock.now += 61
+        assert await ResultCache(10, 60, SQLiteCacheBackend(path)).get("a") is None
+        for result_cache in (writer, reader):
+            await result_cache.close()
+
+    asyncio.run(run())
+
+
+def test_warm_up_loads_the_freshest_entries_with_their_remaining_ttl(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def run():
+        writer = ResultCache(10, 60, SQLiteCacheBackend(path))
+        for key in ("old", "middle", "new"):
+            await writer.set(key, {**RESULT, "keywords": [key]})
+            clock.now += 10
+
+        warmed = ResultCache(2, 60, SQLiteCacheBackend(path))
+        assert await warmed.warm_up(limit=100) == 2
+        assert list(warmed.memory._entries) == ["middle", "new"]
+
+        # "middle" was written 20s ago, so 40s of its TTL are left
+        clock.now += 40.1
+        assert warmed.memory.get("middle") is None
+        assert warmed.memory.get("new")["keywords"] == ["new"]
+        for result_cache in (writer, warmed):
+            await result_cache.close()
+
+    asyncio.run(run())
+
+
+def test_backend_errors_are_counted_not_raised():
+    async def run():
+        result_cache = ResultCache(10, 60, FailingBackend())
+        await result_cache.set("a", RESULT)
+        assert await result_cache.get("a") == RESULT
+        assert await result_cache.get("b") is None
+        assert result_cache.backend_errors == 2
+
+    asyncio.run(run())
+
+
+def test_create_result_cache_picks_the_backend(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "CACHE_SQLITE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(config, "WORKERS", 1)
+
+    monkeypatch.setattr(config, "CACHE_ENABLED", False)
+    assert create_result_cache() is None
+
+    monkeypatch.setattr(config, "CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "CACHE_BACKEND", "none")
+    assert create_result_cache().backend is None
+    monkeypatch.setattr(config, "CACHE_BACKEND", "sqlite")
+    assert create_result_cache().backend.name == "sqlite"
+
+    # Several workers share one SQLite file rather than an LRU each
+    monkeypatch.setattr(config, "CACHE_BACKEND", "none")
+    monkeypatch.setattr(config, "WORKERS", 2)
+    assert create_result_cache().backend.name == "sqlite"
+
+    monkeypatch.setattr(config, "CACHE_BACKEND", "memcached")
+    with pytest.raises(ValueError):
+        create_result_cache()
+
+
+def test_bumping_the_prompt_version_misses_old_entries(monkeypatch):
+    class CountingProvider(MockProvider):
+        calls = 0
+
+        async def complete(self, *args):
+            CountingProvider.calls += 1
+            return await super().complete(*args)
+
+    async def run():
+        service = LLMService(
+            router=ProviderRouter([CountingProvider(latency_ms=1)], hedging_enabled=False),
+            cache=ResultCache(10, 60)
+        )
+        service.mode = "llm"
+        service.batcher = None
+        service.similarity_index = None
+        text = "I am worried about the exam but excited for the trip"
+
+        await service.analyze_text(text)
+        await service.analyze_text(text)
+        assert CountingProvider.calls == 1
+
+        monkeypatch.setattr(llm_service, "PROMPT_VERSION", "next")
+        await service.analyze_text(text)
+        assert CountingProvider.calls == 2
+
+    asyncio.run(run())
@@ -0,0 +1,119 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryBudget, backoff_delay
+
+
+class FakeClock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_opens_after_consecutive_failures_only(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 1
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+    assert breaker.stats()["retry_in_seconds"] == 10.0
+
+
+def test_half_open_admits_one_trial_and_closes_on_success(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+
+    clock.now += 9.9
+    assert not breaker.allow_request()
+    clock.now += 0.1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_failed_trial_reopens_for_a_full_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=5, recovery_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow_request()
+
+    # One failure is enough in half-open, whatever the threshold
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    clock.now += 5
+    assert not breaker.allow_request()
+    clock.now += 5
+    assert breaker.allow_request()
+
+
+def test_trial_that_never_reports_back_does_not_wedge_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow_request()
+
+    clock.now += 5
+    assert not breaker.allow_request()
+    clock.now += 5
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+
+
+def test_retry_budget_keeps_retries_under_the_ratio(clock):
+    budget = RetryBudget(ratio=0.2, min_per_second=0.1, window_seconds=10)
+
+    # With no traffic the floor still allows min_per_second * window retries
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+    for _ in range(20):
+        budget.record_request()
+    # 20% of 20 requests is 4 retries, one of which is already used
+    assert [budget.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert budget.exhausted == 2
+
+    # Once the window has passed, requests and retries no longer count
+    clock.now += 10.1
+    stats = budget.stats()
+    assert stats["requests_in_window"] == 0 and stats["retries_in_window"] == 0
+    assert budget.try_acquire()
+
+
+def test_backoff_delay_stays_within_the_jittered_bounds(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "random", random.Random(42))
+
+    for attempt in range(8):
+        ceiling = min(2.0, 0.1 * 2 ** attempt)
+        delays = [backoff_delay(attempt, base=0.1, cap=2.0) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Full jitter spreads the delays over the whole range
+        assert min(delays) < 0.2 * ceiling and max(delays) > 0.8 * ceiling
@@ -0,0 +1,41 @@
+import pytest
+
+from app.services import lexicon
+
+# Outputs of the keyword fallback as it was before the lexicon tables
+# (LLMService._generate_fallback_response), which score_text must reproduce
+EXPECTED = [
+    ("I just got promoted and I'm so happy!",
+     {"sentiment": 0.8, "sentiment_type": "positive", "keywords": ["promoted", "happier", "work"],
+      "dominant_emotion": "joy"}),
+    ("This is the worst day of my life, I'm so sad and angry",
+     {"sentiment": -0.65, "sentiment_type": "negative", "keywords": ["sad", "angry"],
+      "dominant_emotion": "sadness"}),
+    ("I'm worried about the exam tomorrow but excited for the trip",
+     {"sentiment": 0.05, "sentiment_type": "neutral", "keywords": ["worried", "excited"],
+      "dominant_emotion": "joy"}),
+    ("Wow, I did not expect that at all",
+     {"sentiment": 0.12, "sentiment_type": "neutral", "keywords": ["wow"], "dominant_emotion": "surprise"}),
+    ("That food was disgusting and gross",
+     {"sentiment": -0.6, "sentiment_type": "negative", "keywords": ["disgusting", "gross"],
+      "dominant_emotion": "disgust"}),
+    ("The meeting is at three",
+     {"sentiment": 0, "sentiment_type": "neutral", "keywords": ["meeting", "three"],
+      "dominant_emotion": "neutral"}),
+    ("I'm terrified and scared of what comes next",
+     {"sentiment": -0.5, "sentiment_type": "negative", "keywords": ["terrified", "scared"],
+      "dominant_emotion": "fear"}),
+    ("",
+     {"sentiment": 0, "sentiment_type": "neutral", "keywords": [], "dominant_emotion": "neutral"}),
+    ("Absolutely furious. Outraged! Devastated, heartbroken.",
+     {"sentiment": -1, "sentiment_type": "negative",
+      "keywords": ["furious", "outraged", "devastated", "heartbroken"], "dominant_emotion": "sadness"}),
+    ("shocked surprised amazed astonished",
+     {"sentiment": 0.48, "sentiment_type": "positive",
+      "keywords": ["shocked", "surprised", "amazed", "astonished"], "dominant_emotion": "surprise"}),
+]
+
+
+@pytest.mark.parametrize("text,expected", EXPECTED)
+def test_score_text_matches_the_original_fallback(text, expected):
+    assert lexicon.score_text(text) == expected
@@ -0,0 +1,111 @@
+import asyncio
+
+from app.services import similarity_index
+from app.services.llm_service import LLMService
+from app.services.providers import MockProvider, ProviderRouter
+from app.services.similarity_index import SimilarityIndex
+
+TEXT = "I am worried about the exam but excited for the trip"
+
+
+class CountingProvider(MockProvider):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def complete(self, system_prompt, prompt, max_tokens):
+        self.calls += 1
+        try:
+            return await super().complete(system_prompt, prompt, max_tokens)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def make_service(latency_ms=50):
+    provider = CountingProvider(latency_ms=latency_ms)
+    service = LLMService(router=ProviderRouter([provider], hedging_enabled=False))
+    service.mode = "llm"
+    service.cache = None
+    service.batcher = None
+    service.similarity_index = None
+    return service, provider
+
+
+def test_identical_concurrent_texts_share_one_provider_call():
+    async def run():
+        service, provider = make_service()
+
+        results = await asyncio.gather(*(service.analyze_text(TEXT) for _ in range(5)))
+
+        assert provider.calls == 1
+        assert service.coalesced_requests == 4
+        assert all(result == results[0] for result in results)
+        # Every caller gets its own copy
+        assert len({id(result) for result in results}) == 5
+        assert service._inflight == {} and service._waiters == {}
+
+    asyncio.run(run())
+
+
+def test_one_waiter_cancelling_leaves_the_call_to_the_others():
+    async def run():
+        service, provider = make_service()
+        leaving = asyncio.create_task(service.analyze_text(TEXT))
+        staying = [asyncio.create_task(service.analyze_text(TEXT)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        leaving.cancel()
+        results = await asyncio.gather(*staying)
+
+        assert leaving.cancelled()
+        assert provider.calls == 1 and provider.cancelled == 0
+        assert service.cancelled_calls == 0
+        assert results[0]["sentiment_type"] in ("positive", "negative", "neutral")
+
+    asyncio.run(run())
+
+
+def test_last_waiter_leaving_cancels_the_call_and_clears_it():
+    async def run():
+        service, provider = make_service(latency_ms=1000)
+        waiters = [asyncio.create_task(service.analyze_text(TEXT)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        task = service._inflight[next(iter(service._inflight))]
+
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert task.cancelled()
+        assert provider.cancelled == 1
+        assert service.cancelled_calls == 1
+        assert service._inflight == {} and service._waiters == {}
+
+        # The next identical text starts afresh instead of joining the cancelled call
+        result = await service.analyze_text(TEXT)
+        assert provider.calls == 2
+        assert result["sentiment_type"] in ("positive", "negative", "neutral")
+
+    asyncio.run(run())
+
+
+def test_similarity_lookup_does_not_break_single_flight(monkeypatch):
+    async def run():
+        # Every scan runs in a thread, so each lookup really suspends
+        monkeypatch.setattr(similarity_index, "OFFLOAD_ROWS", 1)
+        service, provider = make_service()
+        index = SimilarityIndex(64, 100, 0.99, 5, namespace="test")
+        index.add(index.probe("an unrelated text about the weather"),
+                  {"sentiment": 0.1, "dominant_emotion": "neutral", "sentiment_type": "neutral", "keywords": []})
+        service.similarity_index = index
+
+        await asyncio.gather(*(service.analyze_text(TEXT) for _ in range(5)))
+
+        assert provider.calls == 1
+        assert index.entries == 2
+
+    asyncio.run(run())
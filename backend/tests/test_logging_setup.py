@@ -0,0 +1,34 @@
+import logging
+import threading
+from collections import deque
+
+from app.logging_setup import AsyncQueueHandler
+from app.services.metrics import LOG_RECORDS_DROPPED
+
+
+def test_every_record_logged_from_threads_is_queued_or_counted_as_dropped():
+    records = deque()
+    handler = AsyncQueueHandler(records, max_size=100)
+    logger = logging.getLogger("tests.logging_setup")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    dropped_before = LOG_RECORDS_DROPPED.value
+
+    def log_many():
+        for i in range(2000):
+            logger.info("record %s", i)
+
+    threads = [threading.Thread(target=log_many) for _ in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        logger.removeHandler(handler)
+
+    assert len(records) == 100
+    assert LOG_RECORDS_DROPPED.value - dropped_before == 8 * 2000 - 100
+    # Messages are resolved when queued, not when the writer formats them
+    assert records[0].args is None and records[0].msg.startswith("record ")
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from app.services.micro_batcher import MicroBatcher
+
+
+class RecordingFlush:
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.cancelled = 0
+
+    async def __call__(self, texts):
+        self.batches.append(list(texts))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return [{"text": text} for text in texts]
+
+
+def test_window_timer_flushes_a_partial_batch():
+    async def run():
+        flush = RecordingFlush()
+        batcher = MicroBatcher(flush, max_items=10, window=0.05)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        results = await asyncio.gather(*(batcher.submit(text) for text in ("a", "b", "c")))
+
+        assert loop.time() - start >= 0.04
+        assert flush.batches == [["a", "b", "c"]]
+        assert results == [{"text": "a"}, {"text": "b"}, {"text": "c"}]
+        assert batcher.flushed_window == 1 and batcher.flushed_full == 0
+
+    asyncio.run(run())
+
+
+def test_max_items_flushes_without_waiting_for_the_window():
+    async def run():
+        flush = RecordingFlush()
+        batcher = MicroBatcher(flush, max_items=3, window=10)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(text) for text in ("a", "b", "c"))), timeout=1
+        )
+
+        assert flush.batches == [["a", "b", "c"]]
+        assert [result["text"] for result in results] == ["a", "b", "c"]
+        assert batcher.flushed_full == 1 and batcher.flushed_window == 0
+        # The full batch cancelled the window timer
+        assert batcher._timer is None
+
+    asyncio.run(run())
+
+
+def test_caller_cancelled_before_the_flush_is_left_out():
+    async def run():
+        flush = RecordingFlush()
+        batcher = MicroBatcher(flush, max_items=10, window=0.05)
+        tasks = [asyncio.create_task(batcher.submit(text)) for text in ("a", "b", "c")]
+        await asyncio.sleep(0)
+
+        tasks[1].cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert flush.batches == [["a", "c"]]
+        assert isinstance(results[1], asyncio.CancelledError)
+        assert results[0] == {"text": "a"} and results[2] == {"text": "c"}
+
+    asyncio.run(run())
+
+
+def test_caller_cancelled_in_flight_does_not_fail_the_rest_of_its_batch():
+    async def run():
+        flush = RecordingFlush(delay=0.05)
+        batcher = MicroBatcher(flush, max_items=3, window=10)
+        tasks = [asyncio.create_task(batcher.submit(text)) for text in ("a", "b", "c")]
+        await asyncio.sleep(0.01)
+
+        tasks[0].cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert results[1:] == [{"text": "b"}, {"text": "c"}]
+        assert flush.cancelled == 0
+
+    asyncio.run(run())
+
+
+def test_batch_is_cancelled_once_every_caller_has_left():
+    async def run():
+        flush = RecordingFlush(delay=10)
+        batcher = MicroBatcher(flush, max_items=2, window=10)
+        tasks = [asyncio.create_task(batcher.submit(text)) for text in ("a", "b")]
+        await asyncio.sleep(0.01)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert flush.cancelled == 1
+        assert not batcher._tasks
+
+    asyncio.run(run())
+
+
+def test_failed_flush_fails_every_caller_in_the_batch():
+    async def failing(texts):
+        raise RuntimeError("upstream down")
+
+    async def run():
+        batcher = MicroBatcher(failing, max_items=2, window=10)
+        results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+        assert [str(result) for result in results] == ["upstream down", "upstream down"]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_close_flushes_whatever_is_pending(count):
+    async def run():
+        flush = RecordingFlush()
+        batcher = MicroBatcher(flush, max_items=10, window=10)
+        tasks = [asyncio.create_task(batcher.submit(str(i))) for i in range(count)]
+        await asyncio.sleep(0)
+
+        await batcher.close()
+
+        assert flush.batches == [[str(i) for i in range(count)]]
+        assert all(task.done() for task in tasks)
+
+    asyncio.run(run())
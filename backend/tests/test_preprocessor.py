@@ -0,0 +1,88 @@
+import asyncio
+
+from app.services import local_scorer
+from app.services.preprocessor import TranscriptPreprocessor
+
+# What a recognizer sends for two utterances of one session: cumulative
+# interims (no punctuation yet), then the punctuated final
+TRANSCRIPT = [
+    "so I went to the doctor yesterday",
+    "so I went to the doctor yesterday the results came back and",
+    "So I went to the doctor yesterday. The results came back and everything looks fine",
+    "So I went to the doctor yesterday. The results came back and everything looks fine. "
+    "I'm so relieved, honestly I was terrified all week.",
+    "So I went to the doctor yesterday. The results came back and everything looks fine. "
+    "I'm so relieved, honestly I was terrified all week. Now I just want to celebrate",
+    "So I went to the doctor yesterday. The results came back and everything looks fine. "
+    "I'm so relieved, honestly I was terrified all week. Now I just want to celebrate with my family tonight.",
+]
+
+
+class FakeLLMService:
+
+    def __init__(self, delays=None):
+        self.texts = []
+        self.delays = delays or {}
+
+    async def analyze_text_with_status(self, text):
+        self.texts.append(text)
+        await asyncio.sleep(self.delays.get(text, 0))
+        return local_scorer.score(text)[0], False
+
+    def _validate_response(self, result):
+        return local_scorer.score(" ".join(result["keywords"]))[0] | {"sentiment": result["sentiment"]}
+
+    @property
+    def upstream_chars(self):
+        return sum(len(text) for text in self.texts)
+
+
+def test_interim_to_final_sends_only_new_sentences():
+    async def run():
+        service = FakeLLMService()
+        preprocessor = TranscriptPreprocessor(service, segment_chars=400)
+        for text in TRANSCRIPT:
+            await preprocessor.analyze(text, "session")
+
+        stateless = sum(len(text) for text in TRANSCRIPT)
+        assert service.upstream_chars < 0.6 * stateless
+        # An unpunctuated interim is one unfinished sentence, so the second is
+        # sent whole; after that, finished sentences are never sent again,
+        # even when the final's punctuation and case differ from the interim
+        assert not any("doctor yesterday" in text for text in service.texts[2:])
+        assert not any("terrified" in text for text in service.texts[4:])
+
+    asyncio.run(run())
+
+
+def test_without_session_every_text_is_analyzed_in_full():
+    async def run():
+        service = FakeLLMService()
+        preprocessor = TranscriptPreprocessor(service, segment_chars=400)
+        await preprocessor.analyze(TRANSCRIPT[3])
+        await preprocessor.analyze(TRANSCRIPT[3])
+
+        assert service.texts == [TRANSCRIPT[3], TRANSCRIPT[3]]
+
+    asyncio.run(run())
+
+
+def test_concurrent_interim_and_final_leave_the_final_as_history():
+    async def run():
+        interim, final = TRANSCRIPT[2], TRANSCRIPT[3]
+        # The interim's upstream call is the slower one, so without the lock
+        # it would finish last and overwrite what the final recorded
+        service = FakeLLMService(delays={interim: 0.05})
+        preprocessor = TranscriptPreprocessor(service, segment_chars=400)
+
+        await asyncio.gather(
+            preprocessor.analyze(interim, "session"),
+            preprocessor.analyze(final, "session"),
+        )
+
+        history = preprocessor._sessions["session"]
+        assert len(history.tail) == len(final.split())
+        # The final reused the interim's finished sentences instead of racing it
+        assert service.upstream_chars < len(interim) + len(final)
+
+    asyncio.run(run())
@@ -0,0 +1,106 @@
+import asyncio
+
+from app.services.providers import MockProvider, ProviderRouter
+
+SYSTEM_PROMPT = "Analyze sentiment."
+PROMPT = 'Text: "I am really happy with this"'
+
+
+def make_router(*providers, **kwargs):
+    kwargs.setdefault("hedge_min_delay", 0.01)
+    kwargs.setdefault("hedge_default_delay", 0.1)
+    return ProviderRouter(list(providers), **kwargs)
+
+
+def complete(router, timeout=5.0):
+    return router.complete(SYSTEM_PROMPT, PROMPT, 200, timeout)
+
+
+def test_hedge_wins_when_primary_is_slow():
+    async def run():
+        slow = MockProvider(latency_ms=2000, name="slow")
+        fast = MockProvider(latency_ms=10, name="fast")
+        router = make_router(slow, fast)
+
+        completion = await complete(router)
+
+        assert completion.provider == "fast"
+        assert completion.latency < 1.0
+        assert router.hedges_fired == 1
+        assert router._stats["fast"].hedges_won == 1
+        assert router._stats["slow"].hedges_lost == 1
+
+    asyncio.run(run())
+
+
+def test_fails_over_when_primary_errors():
+    async def run():
+        broken = MockProvider(latency_ms=5, error_rate=1.0, name="broken")
+        healthy = MockProvider(latency_ms=5, name="healthy")
+        router = make_router(broken, healthy, hedging_enabled=False)
+
+        completion = await complete(router)
+
+        assert completion.provider == "healthy"
+        assert router.failovers == 1
+        assert router._stats["broken"].failures == 1
+
+    asyncio.run(run())
+
+
+def test_primary_that_slows_down_is_demoted():
+    async def run():
+        a = MockProvider(latency_ms=20, name="a")
+        b = MockProvider(latency_ms=40, name="b")
+        router = make_router(a, b)
+        for _ in range(10):
+            await complete(router)
+        assert router._ranked()[0] is a
+
+        a.latency = 3.0
+        answered_by = [(await complete(router)).provider for _ in range(6)]
+
+        assert router._ranked()[0] is b
+        assert answered_by[-3:] == ["b", "b", "b"]
+        # Once demoted, requests go straight to b instead of waiting out a hedge
+        hedges = router.hedges_fired
+        completion = await complete(router)
+        assert completion.provider == "b"
+        assert router.hedges_fired == hedges
+        assert completion.latency < 0.1
+
+    asyncio.run(run())
+
+
+def test_cancelled_only_provider_is_not_preferred():
+    async def run():
+        slow = MockProvider(latency_ms=3000, name="slow")
+        fast = MockProvider(latency_ms=10, name="fast")
+        router = make_router(slow, fast)
+
+        await complete(router)
+
+        assert router._stats["slow"].score() > 0.0
+        assert router._ranked()[0] is fast
+
+    asyncio.run(run())
+
+
+def test_failed_provider_is_reprobed():
+    async def run():
+        flaky = MockProvider(latency_ms=5, error_rate=1.0, name="flaky")
+        steady = MockProvider(latency_ms=20, name="steady")
+        router = make_router(flaky, steady, hedging_enabled=False, reprobe_after=0.2)
+
+        await complete(router)
+        assert router._ranked()[0] is steady
+
+        flaky.error_rate = 0.0
+        await asyncio.sleep(0.25)
+        completion = await complete(router)
+
+        assert completion.provider == "flaky"
+        assert router._stats["flaky"].reprobes == 1
+        assert router._stats["flaky"].score() < router._stats["steady"].ewma_latency
+
+    asyncio.run(run())
@@ -0,0 +1,169 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import dependencies
+from app.services import rate_limiter, shared_state
+from app.services.rate_limiter import ConcurrencyLimiter, SharedTokenBucketLimiter, TokenBucketLimiter
+from app.services.shared_state import SharedStateStore
+
+
+class FakeClock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=clock))
+    monkeypatch.setattr(shared_state, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+def make_connection(limiter, headers=None, host="10.0.0.1"):
+    return SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(rate_limiter=limiter)),
+        headers=headers or {},
+        client=SimpleNamespace(host=host),
+    )
+
+
+def test_bucket_rejects_past_the_burst_and_refills(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=2)
+
+    assert limiter.try_acquire("a") == (True, 0.0)
+    assert limiter.try_acquire("a") == (True, 0.0)
+    allowed, retry_after = limiter.try_acquire("a")
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+    # Other clients have buckets of their own
+    assert limiter.try_acquire("b") == (True, 0.0)
+
+    clock.now += 1.0
+    assert limiter.try_acquire("a") == (True, 0.0)
+    assert limiter.allowed == 4 and limiter.limited == 1
+
+
+def test_cost_above_the_burst_is_paid_off_as_debt(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=2)
+
+    # A full bucket admits the whole batch and goes three tokens into debt
+    assert limiter.try_acquire("a", cost=5) == (True, 0.0)
+    allowed, retry_after = limiter.try_acquire("a")
+    assert not allowed
+    assert retry_after == pytest.approx(4.0)
+
+    clock.now += 4.0
+    assert limiter.try_acquire("a") == (True, 0.0)
+
+
+def test_least_recently_seen_client_is_evicted(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=1, max_clients=2)
+    limiter.try_acquire("a")
+    limiter.try_acquire("b")
+    limiter.try_acquire("a")
+    limiter.try_acquire("c")
+
+    assert list(limiter._buckets) == ["a", "c"]
+    # "a" kept its empty bucket; "b" comes back with a full one
+    assert not limiter.try_acquire("a")[0]
+    assert limiter.try_acquire("b")[0]
+
+
+def test_shared_buckets_are_drawn_from_by_every_worker(clock, tmp_path):
+    path = str(tmp_path / "shared.db")
+    workers = [SharedTokenBucketLimiter(60, 3, SharedStateStore(path)) for _ in range(2)]
+
+    results = [workers[i % 2].try_acquire("ip:10.0.0.1")[0] for i in range(4)]
+    assert results == [True, True, True, False]
+
+    allowed, retry_after = workers[0].try_acquire("ip:10.0.0.1")
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+    clock.now += 1.0
+    assert workers[1].try_acquire("ip:10.0.0.1") == (True, 0.0)
+    assert asyncio.run(workers[0].stats_async())["tracked_clients"] == 1
+
+
+def test_charge_rate_limit_reports_retry_after(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=30, burst=1)
+    conn = make_connection(limiter)
+
+    async def run():
+        assert await dependencies.charge_rate_limit(conn) is None
+        return await dependencies.charge_rate_limit(conn)
+
+    retry_after = asyncio.run(run())
+    assert retry_after == pytest.approx(2.0)
+    assert dependencies.rate_limited_error(retry_after).headers == {"Retry-After": "2"}
+    # Never tells a client to come back in zero seconds
+    assert dependencies.rate_limited_error(0.2).headers == {"Retry-After": "1"}
+
+
+def test_only_allow_listed_keys_get_their_own_bucket(monkeypatch):
+    monkeypatch.setattr(
+        dependencies, "_KNOWN_KEY_DIGESTS", frozenset({dependencies._key_digest("known")})
+    )
+
+    known = dependencies.client_key(make_connection(None, {"x-api-key": "known"}))
+    bearer = dependencies.client_key(make_connection(None, {"authorization": "Bearer known"}))
+    unknown = dependencies.client_key(make_connection(None, {"x-api-key": "made-up"}))
+
+    assert known == bearer == f"key:{dependencies._key_digest('known')}"
+    assert "known" not in known[len("key:"):]
+    assert unknown == "ip:10.0.0.1"
+
+
+def test_queue_rejects_when_full_and_after_the_timeout():
+    async def run():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.02)
+        assert await limiter.acquire()
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not await limiter.acquire()
+        assert not await waiter
+
+        assert limiter.rejected_queue_full == 1
+        assert limiter.rejected_timeout == 1
+        limiter.release()
+        assert limiter.active == 0 and limiter.waiting == 0
+
+    asyncio.run(run())
+
+
+def test_timed_out_or_cancelled_waits_never_leak_a_permit():
+    async def run():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=10, queue_timeout=0.01)
+        loop = asyncio.get_running_loop()
+        for attempt in range(40):
+            assert await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+
+            if attempt % 2:
+                # The permit frees up just as the wait times out
+                loop.call_later(limiter.queue_timeout, limiter.release)
+                admitted = await waiter
+                await asyncio.sleep(0)
+            else:
+                # The waiter is cancelled in the same iteration the permit frees up
+                limiter.release()
+                waiter.cancel()
+                try:
+                    admitted = await waiter
+                except asyncio.CancelledError:
+                    admitted = False
+            if admitted:
+                limiter.release()
+
+            assert limiter.active == 0 and limiter.waiting == 0
+            assert limiter._semaphore._value == 1
+
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.services.session_aggregator import SessionAggregator, SessionState, SharedSessionAggregator
+from app.services.shared_state import SharedStateStore
+
+RESULT = {"sentiment": 0.6, "sentiment_type": "positive", "keywords": ["trip"], "dominant_emotion": "joy"}
+SETTINGS = dict(max_sessions=100, idle_ttl=3600, window=5, alpha=0.5, top_k=3)
+
+
+def test_state_saved_with_another_window_summarizes_as_empty():
+    saved = SessionState("s", 10)
+    SessionAggregator(**{**SETTINGS, "window": 10})._apply(saved, RESULT)
+
+    state = SessionState.from_dict("s", 5, saved.to_dict())
+    summary = SessionAggregator(**SETTINGS)._summary(state)
+
+    assert summary["count"] == 0
+    assert summary["ewma_sentiment"] is None
+
+
+def test_workers_share_session_aggregates(tmp_path):
+    path = str(tmp_path / "shared.db")
+
+    async def run():
+        workers = [SharedSessionAggregator(**SETTINGS, store=SharedStateStore(path)) for _ in range(2)]
+        for i in range(4):
+            await workers[i % 2].record_async("s", RESULT)
+
+        summary = await workers[0].get_async("s")
+        assert summary["count"] == 4
+        assert summary["ewma_sentiment"] == 0.6
+        stats = await workers[1].stats_async()
+        assert stats["shared"] and stats["active_sessions"] == 1
+
+    asyncio.run(run())
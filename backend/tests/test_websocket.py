@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import config
+from app.main import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Config.validate reads the class attributes
+    monkeypatch.setattr(type(config), "LLM_PROVIDERS", ["mock"])
+    monkeypatch.setattr(type(config), "WARMUP_ENABLED", False)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_session_id_is_limited_like_the_http_routes(client):
+    with client.websocket_connect("/ws/analyze?session_id=" + "a" * 128) as websocket:
+        assert websocket.receive_json() == {"type": "ready", "session_id": "a" * 128}
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/ws/analyze?session_id=" + "a" * 129) as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 1008